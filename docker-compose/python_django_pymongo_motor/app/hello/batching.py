@@ -0,0 +1,58 @@
+"""
+Worker-side accumulator for per-user processing (see tasks.process_user_data).
+
+Individually enqueued user ids are pushed onto a Redis list instead of each
+costing a MongoDB round trip. The buffer is flushed as one bulk_write when
+it holds USER_BATCH_SIZE ids, or USER_BATCH_INTERVAL_MS after the first id
+of a window arrived (a delayed flush task, scheduled once per window).
+
+Buffered ids are processed at most once: ids popped by a worker that dies
+before its bulk_write are not retried.
+"""
+import redis
+from django.conf import settings
+
+
+BUFFER_KEY = 'batch:process_user_data:ids'
+SCHEDULED_KEY = 'batch:process_user_data:flush_scheduled'
+
+_redis_client = None
+
+
+def get_batch_client():
+    """Get or create the Redis client holding the accumulator buffer"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.USER_BATCH_REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
+def buffer_user_id(user_id):
+    """
+    Add an id to the buffer.
+
+    Returns 'flush' if the buffer is full and should be flushed now,
+    'schedule' if this id opened a new window (schedule a delayed flush),
+    otherwise None.
+    """
+    client = get_batch_client()
+    length = client.rpush(BUFFER_KEY, user_id)
+    if length >= settings.USER_BATCH_SIZE:
+        return 'flush'
+    if client.set(SCHEDULED_KEY, 1, nx=True, px=settings.USER_BATCH_INTERVAL_MS * 2):
+        return 'schedule'
+    return None
+
+
+def drain_user_ids():
+    """Yield batches of at most USER_BATCH_SIZE ids until the buffer is empty"""
+    client = get_batch_client()
+    # Ids arriving from now on open a new window
+    client.delete(SCHEDULED_KEY)
+    while True:
+        ids = client.lpop(BUFFER_KEY, settings.USER_BATCH_SIZE)
+        if not ids:
+            return
+        yield ids
+        if len(ids) < settings.USER_BATCH_SIZE:
+            return
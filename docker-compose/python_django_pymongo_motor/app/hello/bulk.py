@@ -0,0 +1,165 @@
+"""
+Bulk ingestion for the users and blog_posts collections.
+
+Rows arrive as NDJSON (one JSON object per line, read from the request
+stream line by line) or as a JSON array. Each row is validated by building
+its document with the regular model helpers; valid rows are written with
+chunked, unordered insert_many calls, a few chunks in flight at a time.
+Errors are reported per row (0-based position in the payload).
+"""
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from pymongo.errors import BulkWriteError
+
+
+# insert_many calls allowed in flight at once
+MAX_IN_FLIGHT = 4
+
+# Per-row errors included in the response (the failed count is always exact)
+MAX_REPORTED_ERRORS = 1000
+
+
+class InvalidBulkPayload(ValueError):
+    """Raised when the request body as a whole cannot be read"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def iter_bulk_rows(request):
+    """
+    Yield (row, data, error) for every row of the request body.
+
+    application/json bodies must be a JSON array and are parsed at once
+    (subject to DATA_UPLOAD_MAX_MEMORY_SIZE); anything else is read as NDJSON
+    from the request stream, so large payloads never sit in memory whole.
+    """
+    if request.content_type == 'application/json':
+        try:
+            rows = json.loads(request.body)
+        except RequestDataTooBig:
+            raise InvalidBulkPayload(
+                'JSON array body too large; send NDJSON (application/x-ndjson) instead',
+                status=413,
+            )
+        except ValueError as e:
+            raise InvalidBulkPayload(f'Invalid JSON: {e}')
+        if not isinstance(rows, list):
+            raise InvalidBulkPayload('JSON body must be an array of objects')
+        for row, data in enumerate(rows):
+            yield row, data, None
+        return
+
+    row = 0
+    for line in request:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield row, json.loads(line), None
+        except ValueError as e:
+            yield row, None, f'Invalid JSON: {e}'
+        row += 1
+
+
+def build_rows(rows, build_document):
+    """Validate rows, yielding (row, document, error)"""
+    for row, data, error in rows:
+        if error is None and not isinstance(data, dict):
+            error = 'Row must be a JSON object'
+        if error is not None:
+            yield row, None, error
+            continue
+        try:
+            yield row, build_document(data), None
+        except KeyError as e:
+            yield row, None, f'Missing field: {e.args[0]}'
+        except (TypeError, ValueError) as e:
+            yield row, None, f'Invalid value: {e}'
+
+
+async def _insert_chunk(collection, documents, row_numbers):
+    """Insert one chunk, returning (inserted, [(row, error), ...])"""
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+        return len(result.inserted_ids), []
+    except BulkWriteError as e:
+        errors = [
+            (row_numbers[err['index']], err.get('errmsg', 'Write error'))
+            for err in e.details.get('writeErrors', [])
+        ]
+        return e.details.get('nInserted', 0), errors
+
+
+async def bulk_insert(collection, rows, build_document, chunk_size=None):
+    """
+    Validate `rows` with `build_document` and insert them into `collection`.
+
+    Returns a summary dict: inserted, failed, errors (per row, capped at
+    MAX_REPORTED_ERRORS) and errors_truncated.
+    """
+    chunk_size = chunk_size or settings.API_BULK_CHUNK_SIZE
+    inserted = failed = 0
+    errors = []
+    pending = set()
+
+    def record(row_errors):
+        nonlocal failed
+        failed += len(row_errors)
+        room = MAX_REPORTED_ERRORS - len(errors)
+        errors.extend({'row': row, 'error': error} for row, error in row_errors[:room])
+
+    async def drain(return_when):
+        nonlocal inserted, pending
+        done, pending = await asyncio.wait(pending, return_when=return_when)
+        # Collect every finished chunk before raising the first failure
+        # (e.g. a network error), so no exception goes unretrieved
+        failure = None
+        for task in done:
+            if task.exception() is not None:
+                failure = failure or task.exception()
+                continue
+            chunk_inserted, chunk_errors = task.result()
+            inserted += chunk_inserted
+            record(chunk_errors)
+        if failure is not None:
+            raise failure
+
+    try:
+        documents, row_numbers = [], []
+        for row, document, error in build_rows(rows, build_document):
+            if error is not None:
+                record([(row, error)])
+                continue
+            documents.append(document)
+            row_numbers.append(row)
+            if len(documents) == chunk_size:
+                if len(pending) >= MAX_IN_FLIGHT:
+                    await drain(asyncio.FIRST_COMPLETED)
+                pending.add(asyncio.ensure_future(_insert_chunk(collection, documents, row_numbers)))
+                documents, row_numbers = [], []
+
+        if documents:
+            pending.add(asyncio.ensure_future(_insert_chunk(collection, documents, row_numbers)))
+        if pending:
+            await drain(asyncio.ALL_COMPLETED)
+    finally:
+        # On failure (or cancellation), stop the chunks still in flight and
+        # wait for them: no task outlives the request. A chunk already sent
+        # to the server may still be applied.
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    errors.sort(key=lambda e: e['row'])
+    return {
+        'inserted': inserted,
+        'failed': failed,
+        'errors': errors,
+        'errors_truncated': failed > len(errors),
+    }
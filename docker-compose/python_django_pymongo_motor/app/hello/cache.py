@@ -0,0 +1,239 @@
+"""
+Redis read-through cache for the list API responses.
+
+Entries hold the encoded JSON bytes of a response, keyed on the endpoint and
+its normalized query parameters. Each collection has a version counter that
+is part of every key; writes bump it (bump_cache_version), so stale entries
+are never read again and simply expire after API_CACHE_TTL seconds.
+
+On a miss, only one request (across all processes) builds the response: it
+takes a short Redis lock while the others poll for the entry it stores,
+falling back to querying MongoDB themselves if the lock times out.
+
+The Redis client is synchronous (like the Celery result backend) and is run
+off the event loop with sync_to_async. Redis errors never fail a request:
+the response is built from MongoDB instead.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import uuid
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'apicache'
+
+# Query parameters holding comma-separated sets, normalized by sorting
+SET_PARAMS = ('fields',)
+
+# Poll interval (seconds) while another request builds the same entry
+LOCK_POLL_INTERVAL = 0.02
+
+_redis_client = None
+
+
+def get_cache_client():
+    """Get or create the Redis client used for API response caching"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(
+            settings.API_CACHE_URL,
+            socket_timeout=settings.API_CACHE_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.API_CACHE_SOCKET_TIMEOUT,
+        )
+    return _redis_client
+
+
+class _CacheStats:
+    """Per-process cache counters (see /api/metrics/cache/)"""
+
+    FIELDS = ('hits', 'misses', 'stores', 'stored_bytes', 'lock_waits', 'lock_timeouts', 'errors')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['hits'] + counts['misses']
+        counts['hit_ratio'] = round(counts['hits'] / lookups, 3) if lookups else None
+        return counts
+
+
+cache_stats = _CacheStats()
+
+
+def _version_key(collection_name):
+    return f'{KEY_PREFIX}:version:{collection_name}'
+
+
+def normalize_params(params):
+    """Canonical query string for a QueryDict: sorted keys, sorted set values"""
+    items = []
+    for name, values in params.lists():
+        for value in values:
+            if name in SET_PARAMS:
+                value = ','.join(sorted({v.strip() for v in value.split(',') if v.strip()}))
+            items.append((name, value))
+    items.sort()
+    return '&'.join(f'{name}={value}' for name, value in items)
+
+
+def cache_key(collection_name, version, path, params):
+    digest = hashlib.sha1(f'{path}?{normalize_params(params)}'.encode()).hexdigest()
+    return f'{KEY_PREFIX}:{collection_name}:{version}:{digest}'
+
+
+def _lookup(collection_name, path, params):
+    """Return (key, cached body or None)"""
+    client = get_cache_client()
+    version = int(client.get(_version_key(collection_name)) or 0)
+    key = cache_key(collection_name, version, path, params)
+    return key, client.get(key)
+
+
+def _acquire(key):
+    """Try to become the request that builds `key`; returns a lock token or None"""
+    token = uuid.uuid4().hex
+    timeout_ms = int(settings.API_CACHE_LOCK_TIMEOUT * 1000)
+    if get_cache_client().set(f'{key}:lock', token, nx=True, px=timeout_ms):
+        return token
+    return None
+
+
+def _poll(key):
+    """Return (entry or None, whether the build lock is still held)"""
+    body, lock = get_cache_client().mget(key, f'{key}:lock')
+    return body, lock is not None
+
+
+async def _wait_for(key):
+    """
+    Wait for the entry another request is building; None if it never shows up.
+
+    Sleeps on the event loop between polls, so waiting requests don't hold
+    on to executor threads the builder needs.
+    """
+    poll = sync_to_async(_poll, thread_sensitive=False)
+    deadline = time.monotonic() + settings.API_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        body, locked = await poll(key)
+        if body is not None or not locked:
+            # Stored, or the builder gave up (e.g. its query failed)
+            return body
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+    return None
+
+
+def _store(key, body):
+    """Store the entry and drop the build lock; waiters see the entry either way"""
+    pipe = get_cache_client().pipeline(transaction=False)
+    pipe.set(key, body, ex=settings.API_CACHE_TTL)
+    pipe.delete(f'{key}:lock')
+    pipe.execute()
+
+
+def _release(key, token):
+    """Delete the build lock if it is still ours"""
+    client = get_cache_client()
+    lock_key = f'{key}:lock'
+    try:
+        if client.get(lock_key) == token.encode():
+            client.delete(lock_key)
+    except redis.RedisError:
+        pass  # the lock expires on its own
+
+
+async def cached_body(collection_name, request, build):
+    """
+    Return (body, status) for a GET request, building it with `build` on a miss.
+
+    `build` is an async callable returning the response bytes. `status` is
+    'HIT', 'MISS' or 'BYPASS' (cache disabled or unreachable).
+    """
+    if not settings.API_CACHE_ENABLED:
+        return await build(), 'BYPASS'
+
+    try:
+        key, body = await sync_to_async(_lookup, thread_sensitive=False)(
+            collection_name, request.path, request.GET
+        )
+        if body is not None:
+            cache_stats.incr('hits')
+            return body, 'HIT'
+        cache_stats.incr('misses')
+
+        token = await sync_to_async(_acquire, thread_sensitive=False)(key)
+        if token is None:
+            # Someone else is querying MongoDB for this entry: share its result
+            cache_stats.incr('lock_waits')
+            body = await _wait_for(key)
+            if body is not None:
+                return body, 'HIT'
+            cache_stats.incr('lock_timeouts')
+    except redis.RedisError as e:
+        cache_stats.incr('errors')
+        logger.warning('API cache unavailable: %s', e)
+        return await build(), 'BYPASS'
+
+    try:
+        body = await build()
+    except BaseException:
+        if token is not None:
+            await sync_to_async(_release, thread_sensitive=False)(key, token)
+        raise
+
+    try:
+        await sync_to_async(_store, thread_sensitive=False)(key, body)
+        cache_stats.incr('stores')
+        cache_stats.incr('stored_bytes', len(body))
+    except redis.RedisError as e:
+        cache_stats.incr('errors')
+        logger.warning('API cache store failed: %s', e)
+    return body, 'MISS'
+
+
+def bump_cache_version(collection_name):
+    """Invalidate every cached response for a collection (after writes)"""
+    if not settings.API_CACHE_ENABLED:
+        return
+    try:
+        get_cache_client().incr(_version_key(collection_name))
+    except redis.RedisError as e:
+        cache_stats.incr('errors')
+        logger.warning('API cache version bump failed for %s: %s', collection_name, e)
+
+
+async def abump_cache_version(collection_name):
+    """Async version of bump_cache_version"""
+    await sync_to_async(bump_cache_version, thread_sensitive=False)(collection_name)
+
+
+def cache_info():
+    """Per-process counters plus the cache's Redis memory and key count"""
+    info = {'enabled': settings.API_CACHE_ENABLED, **cache_stats.snapshot()}
+    if settings.API_CACHE_ENABLED:
+        try:
+            client = get_cache_client()
+            memory = client.info('memory')
+            info['redis'] = {
+                'used_memory': memory.get('used_memory'),
+                'used_memory_human': memory.get('used_memory_human'),
+                'maxmemory': memory.get('maxmemory'),
+                'keys': client.dbsize(),
+            }
+        except redis.RedisError as e:
+            info['redis'] = {'error': str(e)}
+    return info
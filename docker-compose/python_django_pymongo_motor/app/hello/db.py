@@ -1,27 +1,71 @@
 """
 Database connection utilities for PyMongo (sync) and Motor (async)
 """
+import asyncio
+import os
+import time
+
 from django.conf import settings
 from pymongo import MongoClient
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from .monitoring import command_metrics, pool_metrics
+
+
+class _LoopAgnosticMotorClient(AsyncIOMotorClient):
+    """
+    Motor client that follows the running event loop.
+
+    Motor binds a client to the first loop it sees. Under uvicorn there is one
+    loop per worker, but under gunicorn + gevent Django runs each async view
+    in a fresh loop (async_to_sync), so a loop-bound client would break on the
+    second request. Motor only uses the loop to create futures for work done
+    in its own thread pool, so resolving it per call is safe and lets every
+    request share the same connection pool.
+    """
+
+    @property
+    def io_loop(self):
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.get_event_loop()
+
 
 # Singleton pattern for database connections
 _mongo_client = None
 _motor_client = None
 
 
+# Pool options passed through from MONGODB_SETTINGS when set
+POOL_OPTIONS = ('maxPoolSize', 'minPoolSize', 'waitQueueTimeoutMS', 'maxIdleTimeMS', 'compressors')
+
+
+def _connection_string():
+    mongo_settings = settings.MONGODB_SETTINGS
+    return (
+        f"mongodb://{mongo_settings['username']}:{mongo_settings['password']}"
+        f"@{mongo_settings['host']}:{mongo_settings['port']}"
+        f"/{mongo_settings['database']}?authSource={mongo_settings['authSource']}"
+    )
+
+
+def _client_options():
+    """Keyword arguments shared by the PyMongo and Motor clients"""
+    options = {
+        name: settings.MONGODB_SETTINGS[name]
+        for name in POOL_OPTIONS
+        if settings.MONGODB_SETTINGS.get(name) not in (None, '')
+    }
+    options['event_listeners'] = [pool_metrics, command_metrics]
+    return options
+
+
 def get_mongo_client():
     """Get or create a PyMongo client (synchronous)"""
     global _mongo_client
     if _mongo_client is None:
-        mongo_settings = settings.MONGODB_SETTINGS
-        connection_string = (
-            f"mongodb://{mongo_settings['username']}:{mongo_settings['password']}"
-            f"@{mongo_settings['host']}:{mongo_settings['port']}"
-            f"/{mongo_settings['database']}?authSource={mongo_settings['authSource']}"
-        )
-        _mongo_client = MongoClient(connection_string)
+        _mongo_client = MongoClient(_connection_string(), **_client_options())
     return _mongo_client
 
 
@@ -35,13 +79,7 @@ def get_motor_client():
     """Get or create a Motor client (asynchronous)"""
     global _motor_client
     if _motor_client is None:
-        mongo_settings = settings.MONGODB_SETTINGS
-        connection_string = (
-            f"mongodb://{mongo_settings['username']}:{mongo_settings['password']}"
-            f"@{mongo_settings['host']}:{mongo_settings['port']}"
-            f"/{mongo_settings['database']}?authSource={mongo_settings['authSource']}"
-        )
-        _motor_client = AsyncIOMotorClient(connection_string)
+        _motor_client = _LoopAgnosticMotorClient(_connection_string(), **_client_options())
     return _motor_client
 
 
@@ -61,3 +99,77 @@ def close_connections():
         _motor_client.close()
         _motor_client = None
 
+
+def _reset_after_fork():
+    """
+    Drop clients inherited from the parent process.
+
+    MongoClient is not fork-safe: its sockets and monitor threads belong to the
+    parent. Gunicorn workers and Celery prefork children get fresh clients (and
+    fresh pool metrics) on first use instead. The inherited clients are not
+    closed, as that would end sessions the parent still uses.
+    """
+    global _mongo_client, _motor_client
+    _mongo_client = None
+    _motor_client = None
+    _count_cache.clear()
+    pool_metrics.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# Collection counters
+#
+# Full count_documents({}) scans grow with the collection, so page renders use
+# the collection metadata count (estimated_document_count) and cache it per
+# process for MONGO_COUNT_CACHE_TTL seconds. Insert paths bump the cached value
+# so a user sees their own writes without waiting for the TTL.
+_count_cache = {}
+
+
+def _cached_count(name):
+    entry = _count_cache.get(name)
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+    return None
+
+
+def _store_count(name, count):
+    _count_cache[name] = (count, time.monotonic() + settings.MONGO_COUNT_CACHE_TTL)
+    return count
+
+
+def get_collection_count(name, exact=False):
+    """
+    Get the number of documents in a collection (synchronous).
+
+    Uses the cached estimated count unless `exact` or MONGO_EXACT_COUNTS is set,
+    in which case a full count_documents({}) is run.
+    """
+    collection = get_mongo_db()[name]
+    if exact or settings.MONGO_EXACT_COUNTS:
+        return _store_count(name, collection.count_documents({}))
+    count = _cached_count(name)
+    if count is None:
+        count = _store_count(name, collection.estimated_document_count())
+    return count
+
+
+async def aget_collection_count(name, exact=False):
+    """Async (Motor) version of get_collection_count"""
+    collection = get_motor_db()[name]
+    if exact or settings.MONGO_EXACT_COUNTS:
+        return _store_count(name, await collection.count_documents({}))
+    count = _cached_count(name)
+    if count is None:
+        count = _store_count(name, await collection.estimated_document_count())
+    return count
+
+
+def bump_collection_count(name, delta=1):
+    """Adjust the cached count after inserting (or deleting) documents"""
+    entry = _count_cache.get(name)
+    if entry:
+        _count_cache[name] = (max(entry[0] + delta, 0), entry[1])
@@ -0,0 +1,180 @@
+"""
+Declarative MongoDB index definitions for the app's collections.
+
+Applied with `python manage.py ensure_indexes` (run from startup.sh), which
+can also report declared indexes that are missing and indexes that are
+unused according to $indexStats.
+"""
+from django.conf import settings
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+
+INDEXES = {
+    'users': [
+        # Users are identified by email
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+        # Keyset pagination on ?sort=created_at (ties broken by _id); also
+        # serves plain created_at range queries through its prefix
+        IndexModel([('created_at', ASCENDING), ('_id', ASCENDING)], name='created_at_id'),
+    ],
+    'blog_posts': [
+        # Also used by cleanup_old_data's created_at range deletes
+        IndexModel([('created_at', ASCENDING), ('_id', ASCENDING)], name='created_at_id'),
+        IndexModel([('author', ASCENDING)], name='author'),
+        # Multikey: one index entry per tag
+        IndexModel([('tags', ASCENDING)], name='tags'),
+    ],
+    'report_counters': [
+        # Top authors / tags of a report type
+        IndexModel([('_id.type', ASCENDING), ('_id.dim', ASCENDING), ('count', DESCENDING)],
+                   name='type_dim_count'),
+    ],
+    'report_counter_deltas': [
+        # Counter deltas staged by a report run (_id: run, part, dim, key)
+        IndexModel([('_id.run', ASCENDING)], name='run'),
+        # Left behind by runs that died before folding them in
+        IndexModel([('staged_at', ASCENDING)], name='staged_at_ttl', expireAfterSeconds=86400),
+    ],
+}
+
+
+def declared_indexes():
+    """INDEXES plus the settings-dependent (TTL) indexes"""
+    indexes = {name: list(models) for name, models in INDEXES.items()}
+    if settings.MONGO_POSTS_TTL_DAYS:
+        # Replaces cleanup_old_data (TTL indexes must be single-field)
+        indexes['blog_posts'].append(IndexModel(
+            [('created_at', ASCENDING)], name='created_at_ttl',
+            expireAfterSeconds=int(settings.MONGO_POSTS_TTL_DAYS * 86400),
+        ))
+    options = {}
+    if settings.MONGO_REPORTS_TTL_DAYS:
+        # TTL: the server deletes reports this long after generated_at
+        options['expireAfterSeconds'] = int(settings.MONGO_REPORTS_TTL_DAYS * 86400)
+    indexes['reports'] = [
+        IndexModel([('generated_at', ASCENDING)], name='generated_at', **options),
+        # Latest report of a type (the incremental watermark)
+        IndexModel([('type', ASCENDING), ('generated_at', DESCENDING)], name='type_generated_at'),
+    ]
+    return indexes
+
+
+# Settings-dependent indexes that must not exist while their setting is off
+# (e.g. a leftover created_at_ttl would keep expiring posts behind
+# cleanup_old_data's back)
+CONDITIONAL_INDEXES = {
+    'blog_posts': ['created_at_ttl'],
+}
+
+
+def _ttl(index):
+    """expireAfterSeconds of an index (model document or list_indexes entry), None if not TTL"""
+    seconds = index.get('expireAfterSeconds')
+    return None if seconds is None else int(seconds)
+
+
+def _stale_indexes(collection_name, declared, existing):
+    """Conditional indexes on the server that are not declared with the current settings"""
+    return [
+        name for name in CONDITIONAL_INDEXES.get(collection_name, ())
+        if name in existing and name not in declared
+    ]
+
+
+def _outdated_indexes(models, existing):
+    """Declared indexes on the server with a different TTL (or TTL vs none)"""
+    return [
+        model.document['name'] for model in models
+        if model.document['name'] in existing
+        and _ttl(existing[model.document['name']]) != _ttl(model.document)
+    ]
+
+
+def _update_ttl(db, collection_name, model):
+    """Change expireAfterSeconds of an existing TTL index in place (collMod)"""
+    document = model.document
+    db.command('collMod', collection_name, index={
+        'name': document['name'],
+        'expireAfterSeconds': document['expireAfterSeconds'],
+    })
+
+
+def ensure_indexes(db):
+    """
+    Create every declared index (no-op for indexes that already exist).
+
+    Indexes are created one at a time so a failure (e.g. duplicate emails
+    blocking the unique index) doesn't stop the others. A changed TTL is
+    applied in place (collMod); making an index TTL or not requires
+    dropping and recreating it, as collMod only converts indexes from
+    MongoDB 5.1. Conditional indexes whose setting is off are dropped.
+    Returns {collection: {'created': [names], 'updated': [names],
+    'dropped': [names], 'errors': {name: message}}}, where `created` only
+    lists indexes that were missing or recreated and `updated` the TTL
+    changes applied in place.
+    """
+    result = {}
+    for collection_name, models in declared_indexes().items():
+        collection = db[collection_name]
+        created, updated, dropped, errors = [], [], [], {}
+        existing = {index['name']: index for index in collection.list_indexes()}
+        declared = {model.document['name'] for model in models}
+        for name in _stale_indexes(collection_name, declared, existing):
+            try:
+                collection.drop_index(name)
+                dropped.append(name)
+            except OperationFailure as e:
+                errors[name] = str(e)
+        outdated = set(_outdated_indexes(models, existing))
+        for model in models:
+            name = model.document['name']
+            try:
+                if name in outdated:
+                    if _ttl(existing[name]) is not None and _ttl(model.document) is not None:
+                        _update_ttl(db, collection_name, model)
+                        updated.append(name)
+                        continue
+                    collection.drop_index(name)
+                    dropped.append(name)
+                # Still sent for existing indexes: a changed key or option
+                # under the same name fails here instead of going unnoticed
+                collection.create_indexes([model])
+                if name not in existing or name in outdated:
+                    created.append(name)
+            except OperationFailure as e:
+                errors[name] = str(e)
+        result[collection_name] = {'created': created, 'updated': updated, 'dropped': dropped, 'errors': errors}
+    return result
+
+
+def index_report(db):
+    """
+    Compare declared indexes with the ones on the server.
+
+    Returns {collection: {'missing': [...], 'outdated': [...], 'stale': [...],
+    'undeclared': [...], 'unused': [...]}}. `outdated` indexes differ from
+    their declaration in TTL, `stale` ones are conditional indexes whose
+    setting is off (ensure_indexes fixes both). `unused` lists indexes with no recorded accesses in $indexStats; the
+    counters are per mongod and reset on restart, so read it after the app
+    has served representative traffic.
+    """
+    report = {}
+    for collection_name, models in declared_indexes().items():
+        collection = db[collection_name]
+        declared = {model.document['name'] for model in models}
+        existing = {index['name']: index for index in collection.list_indexes()}
+        stale = _stale_indexes(collection_name, declared, existing)
+        unused = [
+            stats['name']
+            for stats in collection.aggregate([{'$indexStats': {}}])
+            if stats['accesses']['ops'] == 0 and stats['name'] != '_id_'
+        ]
+        report[collection_name] = {
+            'missing': sorted(declared - set(existing)),
+            'outdated': sorted(_outdated_indexes(models, existing)),
+            'stale': sorted(stale),
+            'undeclared': sorted(set(existing) - declared - set(stale) - {'_id_'}),
+            'unused': sorted(unused),
+        }
+    return report
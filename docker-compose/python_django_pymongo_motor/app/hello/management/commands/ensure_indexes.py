@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hello.db import get_mongo_db
+from hello.indexes import ensure_indexes, index_report
+
+
+class Command(BaseCommand):
+    help = 'Create the MongoDB indexes declared in hello/indexes.py'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', action='store_true',
+                            help='Also report missing, undeclared and unused ($indexStats) indexes')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report, create nothing; exit non-zero if declared indexes are '
+                                 'missing or differ in TTL, or disabled TTL indexes still exist')
+
+    def handle(self, *args, **options):
+        db = get_mongo_db()
+
+        if not options['check']:
+            for collection_name, result in ensure_indexes(db).items():
+                if result['created']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{collection_name}: created {', '.join(result['created'])}"
+                    ))
+                if result['updated']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{collection_name}: TTL updated {', '.join(result['updated'])}"
+                    ))
+                if not any(result.values()):
+                    self.stdout.write(self.style.SUCCESS(f'{collection_name}: up to date'))
+                if result['dropped']:
+                    self.stdout.write(self.style.WARNING(
+                        f"{collection_name}: dropped {', '.join(result['dropped'])}"
+                    ))
+                for name, error in result['errors'].items():
+                    self.stderr.write(self.style.ERROR(f'{collection_name}.{name}: {error}'))
+
+        if not (options['report'] or options['check']):
+            return
+
+        out_of_date = False
+        for collection_name, report in index_report(db).items():
+            if report['missing']:
+                out_of_date = True
+                self.stdout.write(self.style.ERROR(
+                    f"{collection_name}: missing {', '.join(report['missing'])}"
+                ))
+            if report['outdated']:
+                out_of_date = True
+                self.stdout.write(self.style.ERROR(
+                    f"{collection_name}: TTL differs from the settings {', '.join(report['outdated'])}"
+                ))
+            if report['stale']:
+                out_of_date = True
+                self.stdout.write(self.style.ERROR(
+                    f"{collection_name}: TTL disabled in the settings but present {', '.join(report['stale'])}"
+                ))
+            if report['undeclared']:
+                self.stdout.write(self.style.WARNING(
+                    f"{collection_name}: not declared {', '.join(report['undeclared'])}"
+                ))
+            if report['unused']:
+                self.stdout.write(self.style.WARNING(
+                    f"{collection_name}: unused since last restart {', '.join(report['unused'])}"
+                ))
+            if not any(report.values()):
+                self.stdout.write(self.style.SUCCESS(f'{collection_name}: OK'))
+
+        if options['check'] and out_of_date:
+            raise CommandError('Indexes do not match the declarations; run `python manage.py ensure_indexes`')
@@ -0,0 +1,157 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.core.management.base import BaseCommand
+from pymongo.errors import BulkWriteError
+
+from hello.db import get_mongo_db
+from hello.models import create_user_document, create_blog_post_document
+
+
+SAMPLE_USERS = [
+    ('Alice', 'alice@example.com', 25),
+    ('Bob', 'bob@example.com', 30),
+    ('Charlie', 'charlie@example.com', 28),
+    ('David', 'david@example.com', 35),
+    ('Eve', 'eve@example.com', 29),
+]
+
+SAMPLE_POSTS = [
+    {
+        'title': 'Getting Started with MongoDB',
+        'content': 'MongoDB is a great NoSQL database that provides flexibility and scalability...',
+        'author': 'Alice',
+        'tags': ['mongodb', 'database', 'nosql'],
+        'metadata': {'views': 100, 'likes': 15},
+    },
+    {
+        'title': 'Django with PyMongo and Motor',
+        'content': 'Using Django with MongoDB through PyMongo and Motor gives you both sync and async capabilities...',
+        'author': 'Bob',
+        'tags': ['django', 'python', 'mongodb', 'motor'],
+        'metadata': {'views': 250, 'likes': 32},
+    },
+    {
+        'title': 'Background Tasks with Celery',
+        'content': 'Celery is a powerful distributed task queue that helps you run background jobs...',
+        'author': 'Charlie',
+        'tags': ['celery', 'python', 'tasks'],
+        'metadata': {'views': 180, 'likes': 24},
+    },
+]
+
+TAGS = ['mongodb', 'database', 'nosql', 'django', 'python', 'motor', 'celery', 'tasks', 'performance']
+
+
+def generate_users(count):
+    """Yield `count` synthetic user documents"""
+    for i in range(count):
+        yield create_user_document(f'Seed User {i}', f'seed{i}@example.com', random.randint(18, 80))
+
+
+def generate_posts(count, users=0, start=0):
+    """
+    Yield `count` synthetic blog post documents, numbered from `start` and
+    written by the first `users` seed users (by the sample users if there are none)
+    """
+    for i in range(start, start + count):
+        yield create_blog_post_document(
+            f'Seed Post {i}',
+            f'Generated post number {i} for load and performance testing.',
+            f'Seed User {random.randrange(users)}' if users else random.choice(SAMPLE_USERS)[0],
+            tags=random.sample(TAGS, k=random.randint(1, 4)),
+            metadata={'views': random.randint(0, 5000), 'likes': random.randint(0, 500)},
+        )
+
+
+def batched(documents, batch_size):
+    """Group an iterable of documents into lists of at most `batch_size`"""
+    batch = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Seed the MongoDB collections (run once at startup, never from views)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=0,
+                            help='Number of synthetic users to insert, e.g. 1_000_000')
+        parser.add_argument('--posts', type=int, default=0,
+                            help='Number of synthetic blog posts; only the ones missing from '
+                                 'earlier runs are inserted')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Documents per insert_many call (default: 1000)')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Parallel insert_many calls in flight (default: 4)')
+
+    def handle(self, *args, **options):
+        db = get_mongo_db()
+
+        # Demo sample data, only into empty collections
+        if db.users.estimated_document_count() == 0:
+            db.users.insert_many([create_user_document(*u) for u in SAMPLE_USERS])
+            self.stdout.write(self.style.SUCCESS(f'Seeded {len(SAMPLE_USERS)} sample users'))
+        if db.blog_posts.estimated_document_count() == 0:
+            db.blog_posts.insert_many([create_blog_post_document(**p) for p in SAMPLE_POSTS])
+            self.stdout.write(self.style.SUCCESS(f'Seeded {len(SAMPLE_POSTS)} sample blog posts'))
+
+        if options['users']:
+            self.bulk_insert(db.users, generate_users(options['users']), options)
+        if options['posts']:
+            # Seed users are numbered from 0, so post authors are drawn from
+            # those already in the collection (this run's and earlier ones)
+            users = db.users.count_documents({'email': {'$regex': r'^seed\d+@example\.com$'}})
+            # Posts have no unique key, so re-seeding (e.g. on every startup)
+            # tops up to the requested count instead of inserting duplicates
+            existing = db.blog_posts.count_documents({'title': {'$regex': r'^Seed Post \d+$'}})
+            if existing < options['posts']:
+                posts = generate_posts(options['posts'] - existing, users, start=existing)
+                self.bulk_insert(db.blog_posts, posts, options)
+
+    def bulk_insert(self, collection, documents, options):
+        """Insert documents with parallel, unordered, batched insert_many calls"""
+        start = time.monotonic()
+        inserted = skipped = 0
+        max_in_flight = options['workers'] * 2
+        in_flight = set()
+
+        def collect(done):
+            nonlocal inserted, skipped
+            for future in done:
+                batch_inserted, batch_skipped = future.result()
+                inserted += batch_inserted
+                skipped += batch_skipped
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            # Batches are generated lazily; only a bounded number are held in memory
+            for batch in batched(documents, options['batch_size']):
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(executor.submit(self.insert_batch, collection, batch))
+            collect(wait(in_flight).done)
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{collection.name}: inserted {inserted}, skipped {skipped} '
+            f'in {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):,.0f} docs/s)'
+        ))
+
+    @staticmethod
+    def insert_batch(collection, batch):
+        """Insert one batch; duplicates (e.g. re-seeding) are skipped, not fatal"""
+        try:
+            result = collection.insert_many(batch, ordered=False)
+            return len(result.inserted_ids), 0
+        except BulkWriteError as e:
+            if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+                raise
+            inserted = e.details.get('nInserted', 0)
+            return inserted, len(batch) - inserted
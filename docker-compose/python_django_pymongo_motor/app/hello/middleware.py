@@ -0,0 +1,85 @@
+"""
+Per-request MongoDB command accounting.
+
+MongoCommandsMiddleware counts the commands a request sends through the
+PyMongo and Motor clients (see CommandMetricsListener in monitoring.py) and
+reports them in a Server-Timing header, shown by the browser's network panel:
+
+    Server-Timing: mongo;dur=3.412;desc="6 commands"
+
+With DEBUG on, X-Mongo-Commands also lists them by name ("6 (count=4, find=2)").
+A request sending more than MONGO_COMMAND_BUDGET commands logs a warning, so
+an N+1 query pattern shows up in the logs before it shows up in latencies.
+
+Streaming responses are skipped: their commands mostly run after the headers
+are sent.
+"""
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .monitoring import RequestCommands, current_request_commands
+
+logger = logging.getLogger(__name__)
+
+
+class MongoCommandsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.MONGO_COMMAND_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        commands = RequestCommands()
+        token = current_request_commands.set(commands)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request_commands.reset(token)
+        return self.report(request, response, commands)
+
+    async def __acall__(self, request):
+        commands = RequestCommands()
+        token = current_request_commands.set(commands)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request_commands.reset(token)
+        return self.report(request, response, commands)
+
+    def report(self, request, response, commands):
+        if response.streaming:
+            return response
+
+        desc = f'{commands.count} command' + ('' if commands.count == 1 else 's')
+        if commands.failed:
+            desc += f', {commands.failed} failed'
+        timing = f'mongo;dur={commands.duration_ms:.3f};desc="{desc}"'
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+
+        by_name = ', '.join(
+            f'{name}={count}'
+            for name, count in sorted(commands.by_name.items(), key=lambda item: (-item[1], item[0]))
+        )
+        if settings.DEBUG:
+            response['X-Mongo-Commands'] = f'{commands.count} ({by_name})' if by_name else '0'
+
+        budget = settings.MONGO_COMMAND_BUDGET
+        if budget and commands.count > budget:
+            logger.warning(
+                '%s %s sent %d MongoDB commands (budget %d) in %.1fms: %s',
+                request.method, request.path, commands.count, budget, commands.duration_ms, by_name,
+            )
+        return response
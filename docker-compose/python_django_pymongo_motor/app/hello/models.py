@@ -4,6 +4,7 @@ Since we're using PyMongo/Motor directly, we don't define Django models.
 Instead, we work with dictionaries and MongoDB documents.
 """
 from datetime import datetime
+
 from bson import ObjectId
 
 
@@ -31,16 +32,44 @@ def create_blog_post_document(title, content, author, tags=None, metadata=None):
     }
 
 
+def user_document_from_data(data):
+    """Build a user document from API input (raises KeyError/ValueError/TypeError)"""
+    return create_user_document(data['name'], data['email'], int(data['age']))
+
+
+def _tags_from_data(tags):
+    """Tags must be a list of strings (they are grouped on by the reports)"""
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError('tags must be a list of strings')
+    return tags
+
+
+def blog_post_document_from_data(data):
+    """Build a blog post document from API input (raises KeyError/ValueError/TypeError)"""
+    return create_blog_post_document(
+        data['title'],
+        data['content'],
+        data['author'],
+        tags=_tags_from_data(data.get('tags', [])),
+        metadata=data.get('metadata', {})
+    )
+
+
 def serialize_document(doc):
-    """Convert MongoDB document to JSON-serializable format"""
+    """
+    Convert MongoDB document to template-friendly format (top-level values only).
+
+    Cheaper than serializers.jsonable_document for template contexts, where
+    nested values are rendered as they are; API responses use serializers.py.
+    """
     if doc is None:
         return None
-    
+
     result = {}
     for key, value in doc.items():
         # Rename _id to id (Django templates can't access underscore attributes)
         new_key = 'id' if key == '_id' else key
-        
+
         if isinstance(value, ObjectId):
             result[new_key] = str(value)
         elif isinstance(value, datetime):
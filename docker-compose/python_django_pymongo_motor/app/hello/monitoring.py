@@ -0,0 +1,224 @@
+"""
+MongoDB driver event listeners.
+
+PoolMetricsListener follows the CMAP (connection pool) events of every
+client in the process and keeps, per server address: pool size, connections
+in use, threads/greenlets waiting for a connection, checkout wait times and
+checkout failures (e.g. waitQueueTimeoutMS expiring).
+
+Metrics are per process (one gunicorn/uvicorn worker or Celery child) and
+served by /api/metrics/mongo/.
+
+CommandMetricsListener adds every command to the RequestCommands of the
+request being served, if any (see middleware.py).
+"""
+import bisect
+import contextvars
+import threading
+
+from pymongo import monitoring
+from pymongo.common import MAX_POOL_SIZE, MIN_POOL_SIZE
+
+
+# Upper bounds (ms) of the checkout wait time histogram buckets
+WAIT_BUCKETS_MS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class _PoolStats:
+    def __init__(self, options=None):
+        # PoolCreatedEvent.options only lists non-default options
+        options = options or {}
+        self.max_pool_size = options.get('maxPoolSize', MAX_POOL_SIZE)
+        self.min_pool_size = options.get('minPoolSize', MIN_POOL_SIZE)
+        self.connections = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.clears = 0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def record_wait(self, duration_ms):
+        self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS_MS, duration_ms)] += 1
+        self.wait_total_ms += duration_ms
+        self.wait_max_ms = max(self.wait_max_ms, duration_ms)
+
+    def wait_percentile(self, percentile):
+        """Upper bound of the bucket holding the given percentile (ms)"""
+        total = sum(self.wait_buckets)
+        if not total:
+            return 0.0
+        threshold = total * percentile / 100
+        seen = 0
+        for i, count in enumerate(self.wait_buckets):
+            seen += count
+            if seen >= threshold:
+                return WAIT_BUCKETS_MS[i] if i < len(WAIT_BUCKETS_MS) else self.wait_max_ms
+        return self.wait_max_ms
+
+    def snapshot(self):
+        saturation = None
+        if self.max_pool_size:
+            saturation = round(self.in_use / self.max_pool_size, 3)
+        waits = sum(self.wait_buckets)
+        return {
+            'max_pool_size': self.max_pool_size,
+            'min_pool_size': self.min_pool_size,
+            'connections': self.connections,
+            'in_use': self.in_use,
+            'max_in_use': self.max_in_use,
+            'saturation': saturation,
+            'waiting': self.waiting,
+            'max_waiting': self.max_waiting,
+            'checkouts': self.checkouts,
+            'checkout_failures': dict(self.checkout_failures),
+            'clears': self.clears,
+            'checkout_wait_ms': {
+                'avg': round(self.wait_total_ms / waits, 3) if waits else 0.0,
+                'p50': self.wait_percentile(50),
+                'p95': self.wait_percentile(95),
+                'p99': self.wait_percentile(99),
+                'max': round(self.wait_max_ms, 3),
+                'buckets': {
+                    (f'le_{bound}' if i < len(WAIT_BUCKETS_MS) else 'inf'): count
+                    for i, (bound, count) in enumerate(
+                        zip(WAIT_BUCKETS_MS + (None,), self.wait_buckets)
+                    )
+                },
+            },
+        }
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Collects connection pool metrics for every client it is registered on"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def reset(self):
+        """Forget all pools; safe in a forked child, where the lock may be held"""
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def _pool(self, address):
+        pool = self._pools.get(address)
+        if pool is None:
+            pool = self._pools[address] = _PoolStats()
+        return pool
+
+    def snapshot(self):
+        with self._lock:
+            return {f'{host}:{port}': pool.snapshot() for (host, port), pool in self._pools.items()}
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pools[event.address] = _PoolStats(event.options)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address).clears += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop(event.address, None)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._pool(event.address).connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.connections = max(pool.connections - 1, 0)
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.waiting += 1
+            pool.max_waiting = max(pool.max_waiting, pool.waiting)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.waiting = max(pool.waiting - 1, 0)
+            pool.checkout_failures[event.reason] = pool.checkout_failures.get(event.reason, 0) + 1
+            if event.duration is not None:
+                pool.record_wait(event.duration * 1000)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.waiting = max(pool.waiting - 1, 0)
+            pool.checkouts += 1
+            pool.in_use += 1
+            pool.max_in_use = max(pool.max_in_use, pool.in_use)
+            if event.duration is not None:
+                pool.record_wait(event.duration * 1000)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.in_use = max(pool.in_use - 1, 0)
+
+
+# Shared by the PyMongo and Motor clients of this process (see db.py)
+pool_metrics = PoolMetricsListener()
+
+
+class RequestCommands:
+    """MongoDB commands sent while serving one request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.failed = 0
+        self.duration_micros = 0
+        self.by_name = {}
+
+    def record(self, command_name, duration_micros, failed=False):
+        with self._lock:
+            self.count += 1
+            self.failed += failed
+            self.duration_micros += duration_micros
+            self.by_name[command_name] = self.by_name.get(command_name, 0) + 1
+
+    @property
+    def duration_ms(self):
+        return self.duration_micros / 1000
+
+
+# RequestCommands of the current request. Motor runs commands in its thread
+# pool under a copy of the context, so the object is updated in place and
+# never replaced while the request is served.
+current_request_commands = contextvars.ContextVar('current_request_commands', default=None)
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Accounts commands to the current request; commands outside a request are ignored"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        commands = current_request_commands.get()
+        if commands is not None:
+            commands.record(event.command_name, event.duration_micros)
+
+    def failed(self, event):
+        commands = current_request_commands.get()
+        if commands is not None:
+            commands.record(event.command_name, event.duration_micros, failed=True)
+
+
+command_metrics = CommandMetricsListener()
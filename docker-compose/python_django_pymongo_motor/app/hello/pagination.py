@@ -0,0 +1,108 @@
+"""
+Keyset (cursor) pagination for the MongoDB list APIs.
+
+Instead of skip/limit, each page is fetched with a range filter on the sort
+key starting after the last document of the previous page. With a matching
+index (see indexes.py) every page costs the same, however deep it is.
+
+The position is handed to clients as an opaque `next` token.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+
+
+# Allowed values for ?sort= ('-' prefix means descending)
+SORT_FIELDS = ('_id', 'created_at')
+
+
+class InvalidPageRequest(ValueError):
+    """Raised when page_size, sort or the cursor token cannot be used"""
+
+
+def parse_page_size(value):
+    """Parse ?page_size=, defaulting and capping it to the configured limits"""
+    if value in (None, ''):
+        return settings.API_PAGE_SIZE
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        raise InvalidPageRequest('page_size must be an integer')
+    if page_size < 1:
+        raise InvalidPageRequest('page_size must be positive')
+    return min(page_size, settings.API_MAX_PAGE_SIZE)
+
+
+def parse_sort(value):
+    """Parse ?sort= into (field, direction)"""
+    value = value or '_id'
+    direction = -1 if value.startswith('-') else 1
+    field = value.lstrip('-')
+    if field not in SORT_FIELDS:
+        raise InvalidPageRequest(f"sort must be one of: {', '.join(SORT_FIELDS)}")
+    return field, direction
+
+
+def encode_cursor(field, direction, doc):
+    """Build the opaque token pointing just after `doc`"""
+    payload = {'s': field, 'd': direction, 'id': str(doc['_id'])}
+    if field != '_id':
+        value = doc.get(field)
+        payload['v'] = value.isoformat() if isinstance(value, datetime) else value
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token produced by encode_cursor into (field, direction, filter)"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        field, direction = payload['s'], payload['d']
+        last_id = ObjectId(payload['id'])
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidId):
+        raise InvalidPageRequest('Invalid next token')
+    if field not in SORT_FIELDS or direction not in (1, -1):
+        raise InvalidPageRequest('Invalid next token')
+
+    op = '$gt' if direction == 1 else '$lt'
+    if field == '_id':
+        return field, direction, {'_id': {op: last_id}}
+
+    value = payload.get('v')
+    if field == 'created_at' and value is not None:
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidPageRequest('Invalid next token')
+    # Ties on the sort field are broken by _id
+    return field, direction, {'$or': [
+        {field: {op: value}},
+        {field: value, '_id': {op: last_id}},
+    ]}
+
+
+def page_query(params):
+    """
+    Turn request query parameters into a keyset page query.
+
+    Returns (filter, sort, page_size, field, direction). A `next` token
+    carries its own sort order, so ?sort= is only read on the first page.
+    """
+    page_size = parse_page_size(params.get('page_size'))
+    token = params.get('next')
+    if token:
+        field, direction, query = decode_cursor(token)
+    else:
+        field, direction = parse_sort(params.get('sort'))
+        query = {}
+
+    sort = [(field, direction)]
+    if field != '_id':
+        sort.append(('_id', direction))
+    return query, sort, page_size, field, direction
@@ -0,0 +1,79 @@
+"""
+Field selection (?fields=) for the MongoDB list APIs.
+
+`?fields=title,author` becomes a MongoDB projection, so unneeded fields are
+never read from BSON, encoded to JSON or sent over the network. Only fields
+on the collection's allowlist (and dotted paths below them) are accepted.
+
+Without ?fields= listings use a compact default projection (blog posts are
+listed without their `content` body); `?fields=all` returns whole documents.
+`_id` (rendered as `id`) is always included.
+"""
+import re
+
+
+# Fields clients may request, per collection
+ALLOWED_FIELDS = {
+    'users': ('name', 'email', 'age', 'created_at', 'updated_at'),
+    'blog_posts': ('title', 'content', 'author', 'tags', 'metadata', 'created_at', 'updated_at'),
+}
+
+# Fields returned by listings without ?fields= (None = whole document)
+DEFAULT_LIST_FIELDS = {
+    'users': None,
+    'blog_posts': ('title', 'author', 'tags', 'metadata', 'created_at', 'updated_at'),
+}
+
+ALL_FIELDS = 'all'
+
+_FIELD_PATH = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$')
+
+
+class InvalidProjection(ValueError):
+    """Raised when ?fields= names a field that may not be selected"""
+
+
+def parse_fields(value, collection_name):
+    """
+    Parse ?fields= into a tuple of field paths.
+
+    Returns None for whole documents (?fields=all, or no default projection).
+    """
+    if value in (None, ''):
+        return DEFAULT_LIST_FIELDS.get(collection_name)
+    if value == ALL_FIELDS:
+        return None
+
+    allowed = ALLOWED_FIELDS.get(collection_name, ())
+    fields = []
+    for field in value.split(','):
+        field = field.strip()
+        if not field or field in ('_id', 'id'):
+            continue
+        if not _FIELD_PATH.match(field) or field.split('.', 1)[0] not in allowed:
+            raise InvalidProjection(
+                f"Unknown field '{field}'; allowed: {', '.join(allowed)} (or '{ALL_FIELDS}')"
+            )
+        fields.append(field)
+    return tuple(dict.fromkeys(fields))
+
+
+def list_projection(collection_name, value, sort_field='_id'):
+    """
+    Build the MongoDB projection for a listing, or None for whole documents.
+
+    The sort field is always included: the next-page token is built from it.
+    """
+    fields = parse_fields(value, collection_name)
+    if fields is None:
+        return None
+    projection = dict.fromkeys(fields, 1)
+    if sort_field != '_id':
+        projection[sort_field] = 1
+    # Collapse paths covered by a selected parent (MongoDB rejects path collisions)
+    projection = {
+        path: 1 for path in projection
+        if not any(path.startswith(parent + '.') for parent in projection)
+    }
+    # An empty projection would return whole documents
+    return projection or {'_id': 1}
@@ -0,0 +1,294 @@
+"""
+Incremental database statistics reports (see tasks.generate_report).
+
+Each run aggregates only the documents created since the previous report of
+the same type (its `watermark`), with one $facet pipeline run on blog_posts
+that pulls in the new users with $unionWith (MongoDB 4.4+). Each side is
+read through its created_at index before the union, and the facets compute
+the new post and user counts and users per age bucket.
+
+The deltas are merged into the previous report's totals. Per-author and
+per-tag counts are unbounded, so they never go through a single document
+(or a task result): a second pipeline groups the new posts by author and
+tag and $merges the counts into report_counter_deltas, staged under the
+run's id, and store_report folds them into the cumulative report_counters
+with another $merge. The report stores the top entries.
+
+Counts cover documents created since tracking began; deletions (e.g. by
+cleanup_old_data) are not subtracted.
+
+The aggregation can also be split by collection and time range
+(split_window) and run as parallel subtasks, each running the same
+pipeline over one collection and range, whose deltas are merged by
+store_report (see tasks.generate_report_parallel).
+"""
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+
+# Age bucket boundaries (lower bound inclusive); the last bucket is open-ended
+AGE_BUCKETS = (0, 18, 25, 35, 45, 55, 65, 200)
+
+# Entries kept in a report's top_authors / top_tags
+TOP_N = 10
+
+# Epoch watermark used for the first report of a type (full aggregation)
+EPOCH = datetime(1970, 1, 1)
+
+# Collections covered by a report (the pipeline runs on the first one)
+REPORT_COLLECTIONS = ('blog_posts', 'users')
+
+
+class ReportInProgress(RuntimeError):
+    """Raised when another run is already building a report of the same type"""
+
+
+def _window(since, until):
+    return {'$match': {'created_at': {'$gt': since, '$lte': until}}}
+
+
+# Fields each report collection contributes to the $facet, tagged by kind
+FACET_FIELDS = {
+    'blog_posts': {'kind': {'$literal': 'post'}},
+    'users': {'kind': {'$literal': 'user'}, 'age': 1},
+}
+
+
+def report_pipeline(since, until, collections=REPORT_COLLECTIONS):
+    """
+    $facet pipeline over the posts and/or users created in (since, until].
+    Run it on collections[0]; the other collections are added with $unionWith.
+    """
+    def source(name):
+        return [_window(since, until), {'$project': {'_id': 0, **FACET_FIELDS[name]}}]
+
+    first, *others = collections
+    posts = {'$match': {'kind': 'post'}}
+    users = {'$match': {'kind': 'user'}}
+    return [
+        *source(first),
+        *({'$unionWith': {'coll': name, 'pipeline': source(name)}} for name in others),
+        {'$facet': {
+            'posts': [posts, {'$count': 'count'}],
+            'users': [users, {'$count': 'count'}],
+            'ages': [users, {'$bucket': {
+                'groupBy': '$age',
+                'boundaries': list(AGE_BUCKETS),
+                'default': 'unknown',
+                'output': {'count': {'$sum': 1}},
+            }}],
+        }},
+    ]
+
+
+def counters_pipeline(since, until, run, part):
+    """
+    Per-author and per-tag counts of the posts created in (since, until],
+    $merged into report_counter_deltas under (run, part) instead of returned
+    (a retried part replaces its own counts)
+    """
+    return [
+        _window(since, until),
+        {'$project': {'_id': 0, 'keys': {'$concatArrays': [
+            [{'dim': 'author', 'key': '$author'}],
+            {'$map': {
+                'input': {'$cond': [{'$isArray': '$tags'}, '$tags', []]},
+                'as': 'tag',
+                'in': {'dim': 'tag', 'key': '$$tag'},
+            }},
+        ]}}},
+        {'$unwind': '$keys'},
+        # Missing authors and non-string tags (stored before tags were
+        # validated) are not counted
+        {'$match': {'keys.key': {'$type': 'string'}}},
+        {'$group': {
+            '_id': {'run': run, 'part': part, 'dim': '$keys.dim', 'key': '$keys.key'},
+            'count': {'$sum': 1},
+        }},
+        {'$set': {'staged_at': '$$NOW'}},
+        {'$merge': {'into': 'report_counter_deltas', 'whenMatched': 'replace', 'whenNotMatched': 'insert'}},
+    ]
+
+
+def age_bucket_label(lower):
+    """'18-24' style label for a bucket's lower boundary"""
+    if lower == 'unknown':
+        return lower
+    upper = AGE_BUCKETS[AGE_BUCKETS.index(lower) + 1]
+    return f'{lower}+' if upper == AGE_BUCKETS[-1] else f'{lower}-{upper - 1}'
+
+
+def _count(rows):
+    return rows[0]['count'] if rows else 0
+
+
+def aggregate_report(db, since, until, run, part=0, collections=REPORT_COLLECTIONS):
+    """
+    Deltas of `collections` for (since, until]: {'posts', 'users', 'ages'};
+    the per-author and per-tag counts are staged in report_counter_deltas
+    under `run`
+    """
+    facet = next(db[collections[0]].aggregate(report_pipeline(since, until, collections)))
+    if 'blog_posts' in collections:
+        db.blog_posts.aggregate(counters_pipeline(since, until, run, part))
+    return {
+        'posts': _count(facet['posts']),
+        'users': _count(facet['users']),
+        'ages': {age_bucket_label(row['_id']): row['count'] for row in facet['ages']},
+    }
+
+
+def merge_deltas(*deltas):
+    """Add up partial deltas (e.g. of several time ranges)"""
+    merged = {'posts': 0, 'users': 0, 'ages': {}}
+    for delta in deltas:
+        for name in ('posts', 'users'):
+            merged[name] += delta.get(name, 0)
+        for bucket, count in delta.get('ages', {}).items():
+            merged['ages'][bucket] = merged['ages'].get(bucket, 0) + count
+    return merged
+
+
+def new_run_id():
+    """Id under which a report run stages its counter deltas"""
+    return uuid.uuid4().hex
+
+
+def _apply_counters(db, report_type, run):
+    """Add the counter deltas staged by `run` to the cumulative report_counters"""
+    db.report_counter_deltas.aggregate([
+        {'$match': {'_id.run': run}},
+        {'$group': {
+            '_id': {'type': report_type, 'dim': '$_id.dim', 'key': '$_id.key'},
+            'count': {'$sum': '$count'},
+        }},
+        {'$merge': {
+            'into': 'report_counters',
+            'whenMatched': [{'$set': {'count': {'$add': ['$count', '$$new.count']}}}],
+            'whenNotMatched': 'insert',
+        }},
+    ])
+
+
+def discard_staged_counters(db, run):
+    """Drop the counter deltas of a finished or failed run (a TTL index is the backstop)"""
+    db.report_counter_deltas.delete_many({'_id.run': run})
+
+
+def _top(db, report_type, dimension, label):
+    """Top TOP_N counters of a dimension as [{label: key, 'count': n}]"""
+    cursor = db.report_counters.find(
+        {'_id.type': report_type, '_id.dim': dimension},
+        sort=[('count', DESCENDING)],
+        limit=TOP_N,
+    )
+    return [{label: doc['_id']['key'], 'count': doc['count']} for doc in cursor]
+
+
+def acquire_lease(db, report_type, now):
+    """Only one run per report type may merge at a time (counters aren't idempotent)"""
+    expires = now + timedelta(seconds=settings.REPORT_LEASE_SECONDS)
+    try:
+        db.report_locks.find_one_and_update(
+            {'_id': report_type, 'expires_at': {'$lt': now}},
+            {'$set': {'expires_at': expires}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # The lock document exists and hasn't expired
+        raise ReportInProgress(f'A {report_type} report is already being generated')
+
+
+def release_lease(db, report_type):
+    db.report_locks.delete_one({'_id': report_type})
+
+
+def last_report(db, report_type):
+    return db.reports.find_one({'type': report_type}, sort=[('generated_at', DESCENDING)])
+
+
+def report_window(db, report_type):
+    """Return (now, since, until) of the next report; the lease must be held"""
+    now = datetime.utcnow()
+    # Documents are stamped with created_at before they're inserted; leave a
+    # margin so slow inserts still land after the watermark
+    until = now - timedelta(seconds=settings.REPORT_WATERMARK_LAG)
+    previous = last_report(db, report_type)
+    since = previous['watermark'] if previous else EPOCH
+    return now, since, until
+
+
+def split_window(collection, since, until, parts):
+    """
+    Split (since, until] into at most `parts` consecutive ranges.
+
+    The split points are spread over the range the collection actually has
+    documents in (a first report starts at EPOCH), so each range holds a
+    comparable share of the data if it was created at a steady rate.
+    """
+    first = collection.find_one(
+        {'created_at': {'$gt': since, '$lte': until}}, {'created_at': 1},
+        sort=[('created_at', 1)],
+    )
+    if first is None or parts <= 1:
+        return [(since, until)]
+    start = first['created_at']
+    step = (until - start) / parts
+    bounds = [since] + [start + step * i for i in range(1, parts)] + [until]
+    return [(lower, upper) for lower, upper in zip(bounds, bounds[1:]) if lower < upper]
+
+
+def store_report(db, report_type, now, since, until, delta, run):
+    """
+    Merge `delta` and the counters staged by `run` into the previous report's
+    totals and insert the new report
+    """
+    previous = last_report(db, report_type)
+    if previous is None:
+        # Full rebuild (first run, or every report expired via TTL)
+        db.report_counters.delete_many({'_id.type': report_type})
+
+    _apply_counters(db, report_type, run)
+
+    totals = previous['stats'] if previous else {}
+    users_by_age = dict(totals.get('users_by_age', {}))
+    for bucket, count in delta['ages'].items():
+        users_by_age[bucket] = users_by_age.get(bucket, 0) + count
+
+    report = {
+        'type': report_type,
+        'generated_at': now,
+        'watermark': until,
+        'previous_watermark': since,
+        'stats': {
+            'total_users': totals.get('total_users', 0) + delta['users'],
+            'total_posts': totals.get('total_posts', 0) + delta['posts'],
+            'new_users': delta['users'],
+            'new_posts': delta['posts'],
+            'users_by_age': users_by_age,
+            'top_authors': _top(db, report_type, 'author', 'author'),
+            'top_tags': _top(db, report_type, 'tag', 'tag'),
+        },
+    }
+    db.reports.insert_one(report)
+    return report
+
+
+def build_report(db, report_type):
+    """
+    Aggregate the data created since the last report of `report_type`, merge
+    it into that report's totals and store the result as a new report.
+    """
+    acquire_lease(db, report_type, datetime.utcnow())
+    run = new_run_id()
+    try:
+        now, since, until = report_window(db, report_type)
+        delta = aggregate_report(db, since, until, run)
+        return store_report(db, report_type, now, since, until, delta, run)
+    finally:
+        discard_staged_counters(db, run)
+        release_lease(db, report_type)
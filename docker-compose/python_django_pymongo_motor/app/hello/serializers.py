@@ -0,0 +1,140 @@
+"""
+Fast BSON-to-JSON serialization for MongoDB documents.
+
+Two entry points:
+
+- jsonable_documents(docs): nested-aware conversion to plain Python values
+  (ObjectId -> str, datetime -> ISO string, Decimal128 -> str). Used where
+  dicts are needed, e.g. single documents in API responses.
+- dumps_documents(docs): encode a whole batch to JSON bytes in one call.
+  The encoder (orjson when installed, else the stdlib C encoder) walks the
+  nested structure and only calls back into Python for BSON types, so there
+  is no per-key Python loop and no copied dicts.
+
+Both entry points rename the top-level `_id` to `id`, like the original
+serialize_document (Django templates can't access underscore attributes).
+"""
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from bson.regex import Regex
+from bson.timestamp import Timestamp
+
+try:
+    import orjson
+except ImportError:  # optional speedup, falls back to the json module
+    orjson = None
+
+
+def _encode_bytes(value):
+    return base64.b64encode(value).decode()
+
+
+def _encode_timestamp(value):
+    return {'t': value.time, 'i': value.inc}
+
+
+def _encode_regex(value):
+    return value.pattern if isinstance(value.pattern, str) else value.pattern.decode()
+
+
+# Exact-type dispatch is cheaper than an isinstance chain on the hot path
+_CONVERTERS = {
+    ObjectId: str,
+    datetime: datetime.isoformat,
+    Decimal128: str,
+    bytes: _encode_bytes,
+    Timestamp: _encode_timestamp,
+    Regex: _encode_regex,
+}
+
+
+_BSON_TYPES = tuple(_CONVERTERS)
+
+
+def _default(value):
+    """json.dumps hook for BSON types the C encoder doesn't know"""
+    converter = _CONVERTERS.get(type(value))
+    if converter is None:
+        for bson_type, converter in _CONVERTERS.items():
+            if isinstance(value, bson_type):
+                break
+        else:
+            raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+    return converter(value)
+
+
+_encoder = json.JSONEncoder(default=_default, separators=(',', ':'), ensure_ascii=False)
+
+
+def _rename_id(doc):
+    """Rename `_id` to `id` in place (no copy of the document)"""
+    if '_id' in doc:
+        doc['id'] = doc.pop('_id')
+    return doc
+
+
+def _wrap(key, body, extra):
+    """Build {key: <pre-encoded body>, **extra} as JSON bytes"""
+    parts = [dumps(key) + b':' + body]
+    parts.extend(dumps(k) + b':' + dumps(v) for k, v in extra.items())
+    return b'{' + b','.join(parts) + b'}'
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, _BSON_TYPES):
+        return _default(value)
+    return value
+
+
+def jsonable_document(doc):
+    """Convert one document (including nested values) to plain Python values"""
+    if doc is None:
+        return None
+    result = {}
+    for key, value in doc.items():
+        result['id' if key == '_id' else key] = _jsonable(value)
+    return result
+
+
+def jsonable_documents(docs):
+    """Convert a batch of documents to plain Python values"""
+    return [jsonable_document(doc) for doc in docs]
+
+
+def dumps(obj):
+    """Encode any structure containing BSON values to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return _encoder.encode(obj).encode()
+
+
+def dumps_documents(docs, key=None, **extra):
+    """
+    Encode a batch of decoded documents to JSON bytes.
+
+    The documents are modified in place (`_id` renamed to `id`). With `key`
+    the batch is wrapped as {key: [...], **extra}, otherwise a bare list is
+    returned.
+    """
+    for doc in docs:
+        _rename_id(doc)
+    if key is None:
+        return dumps(docs)
+    return _wrap(key, dumps(docs), extra)
+
+
+def dumps_document_lines(docs):
+    """Encode a batch of decoded documents as NDJSON (one line per document)"""
+    if orjson is not None:
+        option = orjson.OPT_APPEND_NEWLINE
+        return b''.join([orjson.dumps(_rename_id(doc), default=_default, option=option) for doc in docs])
+    encode = _encoder.encode
+    return ''.join([encode(_rename_id(doc)) + '\n' for doc in docs]).encode()
@@ -0,0 +1,116 @@
+"""
+Streaming responses for large MongoDB collection reads.
+
+Documents are read from the cursor `batch_size` at a time and each batch is
+encoded and sent as soon as it is ready, so memory per request stays flat
+whatever the result size.
+
+Two formats are supported:
+- JSON (?stream=1): a single `{"<key>": [...]}` document sent in chunks
+- NDJSON (?format=ndjson or Accept: application/x-ndjson): one document per line
+"""
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .db import get_mongo_db, get_motor_db
+from .pagination import InvalidPageRequest
+from .serializers import dumps_document_lines, dumps_documents
+
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def wants_ndjson(request):
+    """True if the client asked for newline-delimited JSON"""
+    if request.GET.get('format') == 'ndjson':
+        return True
+    return NDJSON_CONTENT_TYPE in request.headers.get('Accept', '')
+
+
+def wants_stream(request):
+    """True if the response should be streamed instead of paginated"""
+    return request.GET.get('stream') in ('1', 'true') or wants_ndjson(request)
+
+
+def parse_batch_size(value):
+    """Parse ?batch_size=, defaulting to API_STREAM_BATCH_SIZE"""
+    if value in (None, ''):
+        return settings.API_STREAM_BATCH_SIZE
+    try:
+        batch_size = int(value)
+    except (TypeError, ValueError):
+        raise InvalidPageRequest('batch_size must be an integer')
+    if batch_size < 1:
+        raise InvalidPageRequest('batch_size must be positive')
+    return min(batch_size, settings.API_MAX_PAGE_SIZE)
+
+
+def _encode_batch(docs, ndjson, first):
+    """Encode one batch of documents as a chunk of the response body"""
+    if ndjson:
+        return dumps_document_lines(docs)
+    # Strip the list brackets: batches are joined into one array
+    body = dumps_documents(docs)[1:-1]
+    return body if first else b',' + body
+
+
+def _iter_chunks(collection_name, key, query, sort, projection, batch_size, ndjson):
+    """Stream the query through a PyMongo cursor (WSGI)"""
+    collection = get_mongo_db()[collection_name]
+    cursor = collection.find(query, projection, sort=sort, batch_size=batch_size)
+    try:
+        if not ndjson:
+            yield f'{{"{key}":['.encode()
+        first = True
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) == batch_size:
+                yield _encode_batch(batch, ndjson, first)
+                first = False
+                batch = []
+        if batch:
+            yield _encode_batch(batch, ndjson, first)
+        if not ndjson:
+            yield b']}'
+    finally:
+        cursor.close()
+
+
+async def _aiter_chunks(collection_name, key, query, sort, projection, batch_size, ndjson):
+    """Stream the query through a Motor cursor (ASGI)"""
+    collection = get_motor_db()[collection_name]
+    cursor = collection.find(query, projection, sort=sort, batch_size=batch_size)
+    try:
+        if not ndjson:
+            yield f'{{"{key}":['.encode()
+        first = True
+        while True:
+            batch = await cursor.to_list(length=batch_size)
+            if not batch:
+                break
+            yield _encode_batch(batch, ndjson, first)
+            first = False
+        if not ndjson:
+            yield b']}'
+    finally:
+        await cursor.close()
+
+
+def stream_response(request, collection_name, key, query, sort, projection=None):
+    """
+    Build a StreamingHttpResponse for `query` (restricted to `projection`).
+
+    Under ASGI the body is produced by an async generator over Motor. Under
+    WSGI Django would have to buffer an async iterator, so a plain generator
+    over a PyMongo cursor is used instead.
+    """
+    batch_size = parse_batch_size(request.GET.get('batch_size'))
+    ndjson = wants_ndjson(request)
+    if isinstance(request, ASGIRequest):
+        chunks = _aiter_chunks(collection_name, key, query, sort, projection, batch_size, ndjson)
+    else:
+        chunks = _iter_chunks(collection_name, key, query, sort, projection, batch_size, ndjson)
+    content_type = NDJSON_CONTENT_TYPE if ndjson else 'application/json'
+    return StreamingHttpResponse(chunks, content_type=content_type)
@@ -0,0 +1,149 @@
+"""
+Waiting for Celery task results without polling.
+
+The Redis result backend publishes every state it stores (PROGRESS updates
+and the final result) on a channel named after the result key,
+`celery-task-meta-<task_id>`. Waiters subscribe to that channel first, then
+read the current state (so a result stored in between isn't missed), and
+afterwards only wake up when a message arrives.
+
+Messages are only used as wake-up signals: the state is re-read through
+AsyncResult, so this doesn't depend on the result serializer.
+
+Under ASGI the subscription uses redis.asyncio; under WSGI (gevent) the SSE
+stream uses the blocking client, which gevent makes cooperative.
+"""
+import time
+
+import redis
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from celery import current_app
+from celery.result import AsyncResult
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .serializers import dumps
+
+
+def task_status_payload(task_id):
+    """Read a Celery task's state from the result backend (blocking)"""
+    task = AsyncResult(task_id)
+
+    response_data = {
+        'task_id': task_id,
+        'status': task.state,
+        'ready': task.ready(),
+    }
+
+    if task.ready():
+        if task.successful():
+            response_data['result'] = task.result
+        else:
+            response_data['error'] = str(task.info)
+    elif task.state == 'PROGRESS':
+        response_data['progress'] = task.info
+
+    return response_data
+
+
+_atask_status_payload = sync_to_async(task_status_payload, thread_sensitive=False)
+
+
+def task_channel(task_id):
+    """Pub/sub channel the result backend publishes the task's states on"""
+    return current_app.backend.get_key_for_task(task_id)
+
+
+async def wait_for_task(task_id, timeout):
+    """Return the task's status payload once it is ready, or after `timeout` seconds"""
+    client = aioredis.Redis.from_url(settings.CELERY_RESULT_BACKEND)
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(task_channel(task_id))
+        payload = await _atask_status_payload(task_id)
+        deadline = time.monotonic() + timeout
+        while not payload['ready']:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None:
+                payload = await _atask_status_payload(task_id)
+        return payload
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+
+
+def _sse_event(payload):
+    return b'event: status\ndata: ' + dumps(payload) + b'\n\n'
+
+
+# Sent when nothing happened for TASK_EVENTS_HEARTBEAT seconds, so proxies
+# keep the connection open
+_SSE_HEARTBEAT = b': keepalive\n\n'
+
+
+def _iter_events(task_id):
+    """SSE stream over the blocking Redis client (WSGI / gevent)"""
+    client = redis.Redis.from_url(settings.CELERY_RESULT_BACKEND)
+    pubsub = client.pubsub()
+    try:
+        pubsub.subscribe(task_channel(task_id))
+        payload = task_status_payload(task_id)
+        yield _sse_event(payload)
+        deadline = time.monotonic() + settings.TASK_EVENTS_MAX_SECONDS
+        while not payload['ready'] and time.monotonic() < deadline:
+            message = pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=settings.TASK_EVENTS_HEARTBEAT
+            )
+            if message is None:
+                yield _SSE_HEARTBEAT
+                continue
+            payload = task_status_payload(task_id)
+            yield _sse_event(payload)
+    finally:
+        pubsub.close()
+        client.close()
+
+
+async def _aiter_events(task_id):
+    """SSE stream over redis.asyncio (ASGI)"""
+    client = aioredis.Redis.from_url(settings.CELERY_RESULT_BACKEND)
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(task_channel(task_id))
+        payload = await _atask_status_payload(task_id)
+        yield _sse_event(payload)
+        deadline = time.monotonic() + settings.TASK_EVENTS_MAX_SECONDS
+        while not payload['ready'] and time.monotonic() < deadline:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=settings.TASK_EVENTS_HEARTBEAT
+            )
+            if message is None:
+                yield _SSE_HEARTBEAT
+                continue
+            payload = await _atask_status_payload(task_id)
+            yield _sse_event(payload)
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+
+
+def task_events_response(request, task_id):
+    """
+    Server-Sent Events stream of a task's states, ending once it is ready.
+
+    Like streaming.stream_response, WSGI gets a plain generator because
+    Django would buffer an async iterator whole.
+    """
+    if isinstance(request, ASGIRequest):
+        events = _aiter_events(task_id)
+    else:
+        events = _iter_events(task_id)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,10 +1,30 @@
 """
 Celery tasks for background processing
 """
-from celery import shared_task
-from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from celery import chord, shared_task
+from datetime import datetime, timedelta
+from django.conf import settings
+from pymongo import UpdateOne
 import time
+from .batching import buffer_user_id, drain_user_ids
+from .cache import bump_cache_version
 from .db import get_mongo_db
+from .reports import (
+    REPORT_COLLECTIONS,
+    ReportInProgress,
+    acquire_lease,
+    aggregate_report,
+    build_report,
+    discard_staged_counters,
+    merge_deltas,
+    new_run_id,
+    release_lease,
+    report_window,
+    split_window,
+    store_report,
+)
 
 
 @shared_task
@@ -14,71 +34,268 @@ def add_numbers(x, y):
     return x + y
 
 
-@shared_task
-def process_user_data(user_id):
-    """Process user data in the background"""
-    time.sleep(3)  # Simulate processing
+def _object_ids(user_ids):
+    """Convert ids to ObjectIds, skipping the ones that aren't valid"""
+    object_ids = []
+    for user_id in user_ids:
+        try:
+            object_ids.append(ObjectId(user_id))
+        except (InvalidId, TypeError):
+            continue
+    return object_ids
+
+
+def _process_users(user_ids):
+    """Mark a batch of users as processed with one bulk_write"""
+    object_ids = _object_ids(user_ids)
+    if not object_ids:
+        return {'requested': len(user_ids), 'matched': 0, 'modified': 0}
     
+    processed_at = datetime.utcnow()
     db = get_mongo_db()
-    result = db.users.update_one(
-        {'_id': user_id},
-        {'$set': {'last_processed': datetime.utcnow()}}
+    result = db.users.bulk_write(
+        [UpdateOne({'_id': _id}, {'$set': {'last_processed': processed_at}}) for _id in object_ids],
+        ordered=False,
     )
+    if result.modified_count:
+        bump_cache_version('users')
     
     return {
-        'user_id': user_id,
-        'processed_at': datetime.utcnow().isoformat(),
-        'modified': result.modified_count
+        'requested': len(user_ids),
+        'matched': result.matched_count,
+        'modified': result.modified_count,
+        'processed_at': processed_at.isoformat(),
     }
 
 
 @shared_task
-def generate_report(report_type='daily'):
-    """Generate a report asynchronously"""
-    time.sleep(5)  # Simulate report generation
-    
-    db = get_mongo_db()
-    
-    # Count users
-    user_count = db.users.count_documents({})
-    
-    # Count blog posts
-    post_count = db.blog_posts.count_documents({})
-    
-    # Store report in MongoDB
-    report = {
-        'type': report_type,
-        'generated_at': datetime.utcnow(),
-        'stats': {
-            'total_users': user_count,
-            'total_posts': post_count,
-        }
-    }
-    
-    db.reports.insert_one(report)
+def process_user_data(user_id):
+    """
+    Process one user's data in the background.
     
+    The id is buffered and processed with others in one bulk_write (see
+    batching.py): when the buffer is full it is flushed here, otherwise by
+    the delayed flush_user_batches task of the current window.
+    """
+    action = buffer_user_id(str(user_id))
+    if action == 'flush':
+        return {'user_id': str(user_id), 'flushed': flush_user_batches()}
+    if action == 'schedule':
+        flush_user_batches.apply_async(countdown=settings.USER_BATCH_INTERVAL_MS / 1000)
+    return {'user_id': str(user_id), 'queued': True}
+
+
+# Fire-and-forget (scheduled internally, nobody reads the result): no result
+# is written to the backend
+@shared_task(ignore_result=True)
+def flush_user_batches():
+    """Process every buffered user id, USER_BATCH_SIZE ids per bulk_write"""
+    totals = {'batches': 0, 'requested': 0, 'matched': 0, 'modified': 0}
+    for user_ids in drain_user_ids():
+        result = _process_users(user_ids)
+        totals['batches'] += 1
+        for name in ('requested', 'matched', 'modified'):
+            totals[name] += result[name]
+    return totals
+
+
+@shared_task
+def process_users_batch(user_ids):
+    """Process a list of users (one message, one bulk_write)"""
+    return _process_users(user_ids)
+
+
+def _report_result(report_type, report):
     return {
         'status': 'completed',
         'report_type': report_type,
+        'watermark': report['watermark'].isoformat(),
         'stats': report['stats']
     }
 
 
-@shared_task
-def cleanup_old_data(days=30):
-    """Clean up old data from the database"""
-    from datetime import timedelta
+# Long tasks are acknowledged after they finish: with --prefetch-multiplier=1
+# the reports worker then reserves no message beyond the one it is running
+@shared_task(acks_late=True)
+def generate_report(report_type='daily'):
+    """Generate a statistics report from the data created since the last one"""
+    db = get_mongo_db()
+    try:
+        report = build_report(db, report_type)
+    except ReportInProgress as e:
+        return {'status': 'skipped', 'report_type': report_type, 'reason': str(e)}
     
+    return _report_result(report_type, report)
+
+
+@shared_task(bind=True, acks_late=True)
+def generate_report_parallel(self, report_type='daily', parts=None):
+    """
+    Generate the same report as generate_report with a chord: one
+    aggregate_report_part subtask per collection and time range (fan-out),
+    merged and stored by merge_report_parts (fan-in). The parts return only
+    scalar counts; their per-author / per-tag counts are staged in MongoDB
+    under the run's id, so the chord payload stays small.
+
+    This task is replaced by the chord, so its result is the report.
+    """
     db = get_mongo_db()
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
+    try:
+        acquire_lease(db, report_type, datetime.utcnow())
+    except ReportInProgress as e:
+        return {'status': 'skipped', 'report_type': report_type, 'reason': str(e)}
+
+    # The lease is held until merge_report_parts (or release_report_lease) runs
+    try:
+        run = new_run_id()
+        now, since, until = report_window(db, report_type)
+        parts = parts or settings.REPORT_PARALLEL_PARTS
+        # Datetimes are passed as ISO strings so they survive any serializer
+        ranges = [
+            (collection_name, lower, upper)
+            for collection_name in REPORT_COLLECTIONS
+            for lower, upper in split_window(db[collection_name], since, until, parts)
+        ]
+        subtasks = [
+            aggregate_report_part.s(collection_name, lower.isoformat(), upper.isoformat(), run, part)
+            for part, (collection_name, lower, upper) in enumerate(ranges)
+        ]
+        callback = merge_report_parts.s(
+            report_type, now.isoformat(), since.isoformat(), until.isoformat(), run
+        ).on_error(release_report_lease.si(report_type, run))
+    except Exception:
+        release_lease(db, report_type)
+        raise
+    return self.replace(chord(subtasks, callback))
+
+
+@shared_task
+def aggregate_report_part(collection_name, since, until, run, part):
+    """Deltas of one collection for (since, until] (counters staged under `run`)"""
+    return aggregate_report(
+        get_mongo_db(), datetime.fromisoformat(since), datetime.fromisoformat(until), run, part,
+        collections=(collection_name,),
+    )
+
+
+@shared_task(acks_late=True)
+def merge_report_parts(deltas, report_type, now, since, until, run):
+    """Chord callback: merge the partial deltas and staged counters and store the report"""
+    db = get_mongo_db()
+    try:
+        report = store_report(
+            db, report_type,
+            datetime.fromisoformat(now),
+            datetime.fromisoformat(since),
+            datetime.fromisoformat(until),
+            merge_deltas(*deltas),
+            run,
+        )
+    finally:
+        discard_staged_counters(db, run)
+        release_lease(db, report_type)
+    return _report_result(report_type, report)
+
+
+@shared_task(ignore_result=True)
+def release_report_lease(report_type, run=None):
+    """Error callback of the report chord: drop its staged counters, let the next run start"""
+    db = get_mongo_db()
+    if run:
+        discard_staged_counters(db, run)
+    release_lease(db, report_type)
+
+
+def _report_progress(task, meta):
+    """Publish PROGRESS state (skipped when the task is called directly or eagerly)"""
+    if task.request.id and not task.request.is_eager:
+        task.update_state(state='PROGRESS', meta=meta)
+
+
+# A cleanup checkpoint older than this is from a run that died long ago:
+# start over with a fresh cutoff instead of resuming it
+CLEANUP_CHECKPOINT_MAX_AGE = timedelta(days=1)
+
+
+@shared_task(bind=True, acks_late=True)
+def cleanup_old_data(self, days=30, batch_size=None, pause=None):
+    """
+    Delete blog posts older than `days`, in small batches.
+
+    Each batch is the next `batch_size` old posts in (created_at, _id) order,
+    read from the created_at_id index and deleted by _id, with `pause`
+    seconds between batches so foreground queries keep their latency. The
+    cutoff and progress are checkpointed in `task_checkpoints`: an
+    interrupted run is resumed (same cutoff, reported as `resumed`) by the
+    next one with the same `days`, unless it was last updated more than
+    CLEANUP_CHECKPOINT_MAX_AGE ago. Deleted posts are gone from the index, so
+    every batch simply starts from the oldest remaining one.
+    """
+    db = get_mongo_db()
+    if settings.MONGO_POSTS_TTL_DAYS:
+        # The TTL index on blog_posts.created_at expires posts instead
+        return {'mode': 'ttl', 'ttl_days': settings.MONGO_POSTS_TTL_DAYS, 'deleted_posts': 0}
+    
+    batch_size = batch_size or settings.CLEANUP_BATCH_SIZE
+    pause = settings.CLEANUP_BATCH_PAUSE if pause is None else pause
+    
+    checkpoint_id = 'cleanup_old_data:blog_posts'
+    checkpoint = db.task_checkpoints.find_one({'_id': checkpoint_id})
+    resumed = bool(
+        checkpoint and checkpoint['days'] == days
+        and checkpoint['updated_at'] > datetime.utcnow() - CLEANUP_CHECKPOINT_MAX_AGE
+    )
+    if resumed:
+        cutoff_date = checkpoint['cutoff']
+        deleted = checkpoint['deleted']
+        batches = checkpoint['batches']
+    else:
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        deleted = batches = 0
+    
+    old_posts = {'created_at': {'$lt': cutoff_date}}
+    while True:
+        ids = [
+            doc['_id'] for doc in db.blog_posts.find(
+                old_posts, {'_id': 1},
+                sort=[('created_at', 1), ('_id', 1)],
+                limit=batch_size,
+            )
+        ]
+        if not ids:
+            break
+        
+        result = db.blog_posts.delete_many({'_id': {'$in': ids}, **old_posts})
+        deleted += result.deleted_count
+        batches += 1
+        db.task_checkpoints.update_one(
+            {'_id': checkpoint_id},
+            {'$set': {
+                'days': days,
+                'cutoff': cutoff_date,
+                'deleted': deleted,
+                'batches': batches,
+                'updated_at': datetime.utcnow(),
+            }},
+            upsert=True,
+        )
+        _report_progress(self, {
+            'deleted_posts': deleted,
+            'batches': batches,
+            'cutoff_date': cutoff_date.isoformat(),
+            'resumed': resumed,
+        })
+        if result.deleted_count:
+            bump_cache_version('blog_posts')
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
     
-    # Delete old blog posts
-    result = db.blog_posts.delete_many({
-        'created_at': {'$lt': cutoff_date}
-    })
+    db.task_checkpoints.delete_one({'_id': checkpoint_id})
     
     return {
-        'deleted_posts': result.deleted_count,
-        'cutoff_date': cutoff_date.isoformat()
+        'deleted_posts': deleted,
+        'batches': batches,
+        'cutoff_date': cutoff_date.isoformat(),
+        'resumed': resumed,
     }
-
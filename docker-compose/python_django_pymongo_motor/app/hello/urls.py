@@ -13,6 +13,13 @@ urlpatterns = [
     # API endpoints
     path('api/users/', views.api_users, name='api_users'),
     path('api/posts/', views.api_posts, name='api_posts'),
-    path('api/tasks/<str:task_id>/', views.api_task_status, name='api_task_status'),
+    path('api/users/bulk/', views.api_users_bulk, name='api_users_bulk'),
+    path('api/posts/bulk/', views.api_posts_bulk, name='api_posts_bulk'),
+    path('api/metrics/mongo/', views.api_mongo_metrics, name='api_mongo_metrics'),
+    path('api/metrics/cache/', views.api_cache_metrics, name='api_cache_metrics'),
+    # Before api/tasks/<task_id>/, which would otherwise match "trigger"
     path('api/tasks/trigger/', views.api_trigger_task, name='api_trigger_task'),
+    path('api/tasks/<str:task_id>/', views.api_task_status, name='api_task_status'),
+    path('api/tasks/<str:task_id>/wait/', views.api_task_wait, name='api_task_wait'),
+    path('api/tasks/<str:task_id>/events/', views.api_task_events, name='api_task_events'),
 ]
@@ -1,6 +1,8 @@
 """
 Views demonstrating PyMongo (sync), Motor (async), and Celery usage
 """
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -8,11 +10,40 @@ from django.views.decorators.http import require_http_methods
 import json
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 import asyncio
+import math
+import os
 
-from .db import get_mongo_db, get_motor_db
-from .models import create_user_document, create_blog_post_document, serialize_document
-from .tasks import add_numbers, process_user_data, generate_report
+from .db import (
+    aget_collection_count,
+    bump_collection_count,
+    get_collection_count,
+    get_mongo_db,
+    get_motor_db,
+)
+from .bulk import InvalidBulkPayload, bulk_insert, iter_bulk_rows
+from .cache import abump_cache_version, bump_cache_version, cache_info, cached_body
+from .monitoring import pool_metrics
+from .models import (
+    blog_post_document_from_data,
+    create_user_document,
+    serialize_document,
+    user_document_from_data,
+)
+from .pagination import InvalidPageRequest, encode_cursor, page_query
+from .projection import InvalidProjection, list_projection
+from .serializers import dumps_documents, jsonable_document
+from .streaming import stream_response, wants_stream
+from .task_events import task_events_response, task_status_payload, wait_for_task
+from .tasks import (
+    add_numbers,
+    cleanup_old_data,
+    generate_report,
+    generate_report_parallel,
+    process_user_data,
+    process_users_batch,
+)
 
 
 def index(request):
@@ -49,51 +80,24 @@ def mongodb_sync_demo(request):
             if name and email and age:
                 user_doc = create_user_document(name, email, int(age))
                 result = db.users.insert_one(user_doc)
+                bump_collection_count('users')
+                bump_cache_version('users')
                 message = f"✅ Successfully created user: {name} (ID: {result.inserted_id})"
             else:
                 message = "❌ Please fill in all fields"
         except ValueError:
             message = "❌ Age must be a valid number"
+        except DuplicateKeyError:
+            message = "❌ A user with this email already exists"
         except Exception as e:
             message = f"❌ Error creating user: {str(e)}"
     
+    exact = request.GET.get('exact') == '1'
+    
     try:
-        # Create sample data if collections are empty
-        user_count = db.users.count_documents({})
-        if user_count == 0:
-            sample_users = [
-                create_user_document('Alice', 'alice@example.com', 25),
-                create_user_document('Bob', 'bob@example.com', 30),
-                create_user_document('Charlie', 'charlie@example.com', 28),
-            ]
-            db.users.insert_many(sample_users)
-        
-        post_count = db.blog_posts.count_documents({})
-        if post_count == 0:
-            sample_posts = [
-                create_blog_post_document(
-                    'Getting Started with MongoDB',
-                    'MongoDB is a great NoSQL database that provides flexibility and scalability...',
-                    'Alice',
-                    tags=['mongodb', 'database', 'nosql'],
-                    metadata={'views': 100, 'likes': 15}
-                ),
-                create_blog_post_document(
-                    'Django with PyMongo and Motor',
-                    'Using Django with MongoDB through PyMongo and Motor gives you both sync and async capabilities...',
-                    'Bob',
-                    tags=['django', 'python', 'mongodb', 'motor'],
-                    metadata={'views': 250, 'likes': 32}
-                ),
-                create_blog_post_document(
-                    'Background Tasks with Celery',
-                    'Celery is a powerful distributed task queue that helps you run background jobs...',
-                    'Charlie',
-                    tags=['celery', 'python', 'tasks'],
-                    metadata={'views': 180, 'likes': 24}
-                )
-            ]
-            db.blog_posts.insert_many(sample_posts)
+        # Sample data is seeded once at startup (python manage.py seed_mongo)
+        user_count = get_collection_count('users', exact=exact)
+        post_count = get_collection_count('blog_posts', exact=exact)
         
         # Fetch all users and posts
         users = list(db.users.find().limit(50))
@@ -107,8 +111,8 @@ def mongodb_sync_demo(request):
             'title': 'PyMongo Sync Demo',
             'users': users_serialized,
             'posts': posts_serialized,
-            'user_count': db.users.count_documents({}),
-            'post_count': db.blog_posts.count_documents({}),
+            'user_count': user_count,
+            'post_count': post_count,
             'connection_status': 'Connected to MongoDB (PyMongo - Sync)',
             'message': message
         }
@@ -127,34 +131,23 @@ def mongodb_sync_demo(request):
         return render(request, 'hello/mongodb_sync.html', context)
 
 
-def mongodb_async_demo(request):
+async def mongodb_async_demo(request):
     """
     Demonstrate Motor's async capabilities.
-    Note: Since Django views are sync by default and Motor requires an async context,
-    we'll demonstrate Motor's features using PyMongo for this simple demo.
-    
-    In a real async Django app (using async def views), you would use Motor directly.
-    For now, we'll show the same data but highlight that this would be async with Motor.
+    This is a true async view: every MongoDB call is awaited on Motor, and the
+    independent reads run concurrently with asyncio.gather.
     """
-    # Use PyMongo for compatibility with sync Django views
-    db = get_mongo_db()
+    db = get_motor_db()
+    exact = request.GET.get('exact') == '1'
     
     try:
-        # Ensure sample data exists
-        user_count = db.users.count_documents({})
-        if user_count == 0:
-            sample_users = [
-                create_user_document('David', 'david@example.com', 35),
-                create_user_document('Eve', 'eve@example.com', 29),
-            ]
-            db.users.insert_many(sample_users)
-        
-        # Fetch data (in a real async view with Motor, these would be: await db.users.find()...)
-        users = list(db.users.find().limit(50))
-        posts = list(db.blog_posts.find().limit(50))
-        
-        user_count = db.users.count_documents({})
-        post_count = db.blog_posts.count_documents({})
+        # Fetch data and counts concurrently (non-blocking)
+        users, posts, user_count, post_count = await asyncio.gather(
+            db.users.find().limit(50).to_list(length=50),
+            db.blog_posts.find().limit(50).to_list(length=50),
+            aget_collection_count('users', exact=exact),
+            aget_collection_count('blog_posts', exact=exact),
+        )
         
         # Serialize documents for template
         users_serialized = [serialize_document(u) for u in users]
@@ -166,8 +159,8 @@ def mongodb_async_demo(request):
             'posts': posts_serialized,
             'user_count': user_count,
             'post_count': post_count,
-            'connection_status': 'Connected to MongoDB (Motor-style operations)',
-            'note': 'This demo shows the data structure. In an async Django view (async def), Motor would provide true non-blocking I/O.'
+            'connection_status': 'Connected to MongoDB (Motor - True Async)',
+            'note': 'Queries above ran concurrently with asyncio.gather. Serve the app with SERVER_MODE=asgi (uvicorn) for a native event loop per worker.'
         }
         
         return render(request, 'hello/mongodb_async.html', context)
@@ -221,33 +214,57 @@ def celery_demo(request):
 
 # API Endpoints
 
+async def _list_page(request, collection, key):
+    """Return one keyset-paginated page of `collection` as JSON, or stream it all"""
+    try:
+        query, sort, page_size, field, direction = page_query(request.GET)
+        projection = list_projection(collection.name, request.GET.get('fields'), field)
+        if wants_stream(request):
+            return stream_response(request, collection.name, key, query, sort, projection)
+    except (InvalidPageRequest, InvalidProjection) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    async def build():
+        # Fetch one extra document to know whether another page exists
+        cursor = collection.find(query, projection).sort(sort).limit(page_size + 1)
+        docs = await cursor.to_list(length=page_size + 1)
+        next_token = None
+        if len(docs) > page_size:
+            docs = docs[:page_size]
+            next_token = encode_cursor(field, direction, docs[-1])
+        return dumps_documents(docs, key, count=len(docs), next=next_token)
+    
+    body, cache_status = await cached_body(collection.name, request, build)
+    response = HttpResponse(body, content_type='application/json')
+    response['X-Cache'] = cache_status
+    return response
+
+
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
-def api_users(request):
-    """REST API endpoint for users (PyMongo)"""
-    db = get_mongo_db()
+async def api_users(request):
+    """REST API endpoint for users (Motor)"""
+    db = get_motor_db()
     
     try:
         if request.method == 'GET':
-            users = list(db.users.find().limit(100))
-            users_data = [serialize_document(u) for u in users]
-            return JsonResponse({'users': users_data, 'count': len(users_data)})
+            return await _list_page(request, db.users, 'users')
         
         elif request.method == 'POST':
             data = json.loads(request.body)
-            user_doc = create_user_document(
-                data['name'],
-                data['email'],
-                int(data['age'])
-            )
-            result = db.users.insert_one(user_doc)
+            user_doc = user_document_from_data(data)
+            result = await db.users.insert_one(user_doc)
+            bump_collection_count('users')
+            await abump_cache_version('users')
             user_doc['_id'] = result.inserted_id
             
             return JsonResponse({
                 'message': 'User created successfully!',
-                'user': serialize_document(user_doc)
+                'user': jsonable_document(user_doc)
             }, status=201)
             
+    except DuplicateKeyError:
+        return JsonResponse({'error': 'A user with this email already exists'}, status=409)
     except Exception as e:
         import traceback
         return JsonResponse({
@@ -258,31 +275,25 @@ def api_users(request):
 
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
-def api_posts(request):
-    """REST API endpoint for blog posts (PyMongo)"""
-    db = get_mongo_db()
+async def api_posts(request):
+    """REST API endpoint for blog posts (Motor)"""
+    db = get_motor_db()
     
     try:
         if request.method == 'GET':
-            posts = list(db.blog_posts.find().limit(100))
-            posts_data = [serialize_document(p) for p in posts]
-            return JsonResponse({'posts': posts_data, 'count': len(posts_data)})
+            return await _list_page(request, db.blog_posts, 'posts')
         
         elif request.method == 'POST':
             data = json.loads(request.body)
-            post_doc = create_blog_post_document(
-                data['title'],
-                data['content'],
-                data['author'],
-                tags=data.get('tags', []),
-                metadata=data.get('metadata', {})
-            )
-            result = db.blog_posts.insert_one(post_doc)
+            post_doc = blog_post_document_from_data(data)
+            result = await db.blog_posts.insert_one(post_doc)
+            bump_collection_count('blog_posts')
+            await abump_cache_version('blog_posts')
             post_doc['_id'] = result.inserted_id
             
             return JsonResponse({
                 'message': 'Blog post created successfully!',
-                'post': serialize_document(post_doc)
+                'post': jsonable_document(post_doc)
             }, status=201)
             
     except Exception as e:
@@ -293,29 +304,98 @@ def api_posts(request):
         }, status=500)
 
 
+async def _bulk_ingest(request, collection, build_document):
+    """Validate and insert NDJSON / JSON array rows, reporting per-row errors"""
+    try:
+        rows = iter_bulk_rows(request)
+        result = await bulk_insert(collection, rows, build_document)
+    except InvalidBulkPayload as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    except Exception as e:
+        import traceback
+        return JsonResponse({
+            'error': str(e),
+            'traceback': traceback.format_exc()
+        }, status=500)
+    
+    if result['inserted']:
+        bump_collection_count(collection.name, result['inserted'])
+        await abump_cache_version(collection.name)
+    return JsonResponse(result, status=200 if result['failed'] == 0 else 207)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def api_users_bulk(request):
+    """Bulk-create users from NDJSON or a JSON array"""
+    return await _bulk_ingest(request, get_motor_db().users, user_document_from_data)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def api_posts_bulk(request):
+    """Bulk-create blog posts from NDJSON or a JSON array"""
+    return await _bulk_ingest(request, get_motor_db().blog_posts, blog_post_document_from_data)
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
-def api_task_status(request, task_id):
+async def api_task_status(request, task_id):
     """Check the status of a Celery task"""
-    from celery.result import AsyncResult
-    
-    task = AsyncResult(task_id)
-    
-    response_data = {
-        'task_id': task_id,
-        'status': task.state,
-        'ready': task.ready(),
-    }
-    
-    if task.ready():
-        if task.successful():
-            response_data['result'] = task.result
-        else:
-            response_data['error'] = str(task.info)
-    
+    # The Celery result backend client is synchronous, so run it off the event loop
+    response_data = await sync_to_async(task_status_payload)(task_id)
+    return JsonResponse(response_data)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def api_task_wait(request, task_id):
+    """Long-poll a Celery task: respond as soon as it is ready, or after ?timeout= seconds"""
+    try:
+        timeout = float(request.GET.get('timeout', settings.TASK_WAIT_DEFAULT_TIMEOUT))
+    except ValueError:
+        return JsonResponse({'error': 'timeout must be a number'}, status=400)
+    timeout = min(max(timeout, 0), settings.TASK_WAIT_MAX_TIMEOUT)
+
+    try:
+        response_data = await wait_for_task(task_id, timeout)
+    except Exception as e:
+        import traceback
+        return JsonResponse({
+            'error': str(e),
+            'traceback': traceback.format_exc()
+        }, status=500)
+    response_data['timed_out'] = not response_data['ready']
     return JsonResponse(response_data)
 
 
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_task_events(request, task_id):
+    """Server-Sent Events stream of a Celery task's states"""
+    return task_events_response(request, task_id)
+
+
+def _number_option(data, name, cast, minimum, default=None):
+    """
+    data[name] as an int or float (`cast`) of at least `minimum`, or
+    `default` when absent; ValueError with a client-facing message otherwise
+    """
+    value = data.get(name)
+    if value is None:
+        return default
+    kind = 'an integer' if cast is int else 'a number'
+    try:
+        if isinstance(value, bool) or (cast is int and isinstance(value, float) and not value.is_integer()):
+            raise ValueError
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be {kind} >= {minimum}')
+    if not (math.isfinite(value) and value >= minimum):
+        raise ValueError(f'{name} must be {kind} >= {minimum}')
+    return value
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def api_trigger_task(request):
@@ -324,20 +404,66 @@ def api_trigger_task(request):
         data = json.loads(request.body)
         task_type = data.get('task_type')
         
+        # Fire-and-forget: don't store the result (its status stays PENDING)
+        options = {'ignore_result': True} if data.get('ignore_result') else {}
+        
         if task_type == 'add':
             x = data.get('x', 5)
             y = data.get('y', 10)
-            task = add_numbers.delay(x, y)
+            task = add_numbers.apply_async((x, y), **options)
             
         elif task_type == 'report':
             report_type = data.get('report_type', 'daily')
-            task = generate_report.delay(report_type)
+            if data.get('parallel'):
+                try:
+                    parts = _number_option(data, 'parts', int, 1)
+                except ValueError as e:
+                    return JsonResponse({'error': str(e)}, status=400)
+                task = generate_report_parallel.apply_async((report_type,), {'parts': parts}, **options)
+            else:
+                task = generate_report.apply_async((report_type,), **options)
             
         elif task_type == 'process_user':
             user_id = data.get('user_id')
             if not user_id:
                 return JsonResponse({'error': 'user_id is required'}, status=400)
-            task = process_user_data.delay(user_id)
+            if not ObjectId.is_valid(user_id):
+                return JsonResponse({'error': 'user_id must be an ObjectId'}, status=400)
+            task = process_user_data.apply_async((user_id,), **options)
+            
+        elif task_type == 'process_users':
+            user_ids = data.get('user_ids')
+            if not isinstance(user_ids, list) or not user_ids:
+                return JsonResponse({'error': 'user_ids must be a non-empty list'}, status=400)
+            invalid = [user_id for user_id in user_ids if not ObjectId.is_valid(user_id)]
+            if invalid:
+                return JsonResponse({
+                    'error': 'user_ids must be ObjectIds',
+                    'invalid': invalid[:100],
+                }, status=400)
+            # One message (and one bulk_write) per USER_BATCH_SIZE ids
+            size = settings.USER_BATCH_SIZE
+            tasks = [
+                process_users_batch.apply_async((user_ids[i:i + size],), **options)
+                for i in range(0, len(user_ids), size)
+            ]
+            return JsonResponse({
+                'message': 'Tasks submitted successfully',
+                'task_ids': [task.id for task in tasks],
+                'task_type': task_type,
+                'user_count': len(user_ids),
+            }, status=202)
+            
+        elif task_type == 'cleanup':
+            try:
+                cleanup_options = {
+                    'days': _number_option(data, 'days', int, 0, default=30),
+                    'batch_size': _number_option(data, 'batch_size', int, 1),
+                    'pause': _number_option(data, 'pause', float, 0),
+                }
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            task = cleanup_old_data.apply_async(kwargs=cleanup_options, **options)
             
         else:
             return JsonResponse({'error': 'Invalid task_type'}, status=400)
@@ -354,3 +480,21 @@ def api_trigger_task(request):
             'error': str(e),
             'traceback': traceback.format_exc()
         }, status=500)
+
+
+@require_http_methods(["GET"])
+def api_mongo_metrics(request):
+    """Connection pool metrics of this worker process"""
+    return JsonResponse({
+        'pid': os.getpid(),
+        'pools': pool_metrics.snapshot(),
+    })
+
+
+@require_http_methods(["GET"])
+def api_cache_metrics(request):
+    """API response cache hit/miss counters of this worker process"""
+    return JsonResponse({
+        'pid': os.getpid(),
+        'cache': cache_info(),
+    })
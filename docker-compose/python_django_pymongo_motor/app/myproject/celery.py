@@ -1,9 +1,14 @@
 import os
 from celery import Celery
 
+from .serialization import register_serializer
+
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
+# Must be registered before the app (and the worker) resolve the serializers
+register_serializer()
+
 app = Celery('myproject')
 
 # Using a string here means the worker doesn't have to serialize
@@ -0,0 +1,51 @@
+"""
+Compact serializer for Celery messages and results: 'msgpackz'.
+
+msgpack, with the payload zlib-compressed when it is larger than
+TASK_COMPRESSION_THRESHOLD bytes (small payloads such as add_numbers
+results would only grow). A one-byte header says which form follows.
+
+Like kombu's own msgpack serializer it only handles msgpack types: tasks
+pass datetimes as ISO strings. Unlike it, maps with non-str keys decode
+(json would turn the keys into strings; msgpackz keeps them as they were).
+"""
+import zlib
+
+import msgpack
+from kombu.serialization import register
+
+
+NAME = 'msgpackz'
+CONTENT_TYPE = 'application/x-msgpackz'
+
+_PLAIN = b'\x00'
+_ZLIB = b'\x01'
+
+
+def pack(obj, threshold, level=6):
+    """Encode `obj`, compressing it if the msgpack form exceeds `threshold` bytes"""
+    data = msgpack.packb(obj, use_bin_type=True)
+    if threshold is not None and len(data) > threshold:
+        return _ZLIB + zlib.compress(data, level)
+    return _PLAIN + data
+
+
+def unpack(payload):
+    if isinstance(payload, str):
+        payload = payload.encode('latin-1')
+    header, data = payload[:1], payload[1:]
+    if header == _ZLIB:
+        data = zlib.decompress(data)
+    elif header != _PLAIN:
+        raise ValueError(f'Unknown {NAME} header {header!r}')
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def _dumps(obj):
+    # Read lazily: the serializer is registered before Django is configured
+    from django.conf import settings
+    return pack(obj, settings.TASK_COMPRESSION_THRESHOLD, settings.TASK_COMPRESSION_LEVEL)
+
+
+def register_serializer():
+    register(NAME, _dumps, unpack, content_type=CONTENT_TYPE, content_encoding='binary')
@@ -43,12 +43,64 @@ INSTALLED_APPS = [
 # Celery Configuration
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://redis:6379/0')
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://redis:6379/0')
-CELERY_ACCEPT_CONTENT = ['json']
-CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
+# Serializer for task messages and results: json, msgpack or msgpackz
+# (msgpack, zlib-compressed above TASK_COMPRESSION_THRESHOLD bytes; see
+# myproject/serialization.py). Every format is accepted so messages queued
+# before a switch still run
+CELERY_TASK_SERIALIZER = os.environ.get('CELERY_SERIALIZER', 'msgpackz')
+CELERY_RESULT_SERIALIZER = CELERY_TASK_SERIALIZER
+CELERY_ACCEPT_CONTENT = ['json', 'msgpack', 'msgpackz']
+CELERY_RESULT_ACCEPT_CONTENT = CELERY_ACCEPT_CONTENT
+TASK_COMPRESSION_THRESHOLD = int(os.environ.get('TASK_COMPRESSION_THRESHOLD', '1024'))
+TASK_COMPRESSION_LEVEL = int(os.environ.get('TASK_COMPRESSION_LEVEL', '6'))
+# Seconds results are kept in Redis (SETEX); fire-and-forget tasks store none
+CELERY_RESULT_EXPIRES = int(os.environ.get('CELERY_RESULT_EXPIRES', '3600'))
 CELERY_TIMEZONE = 'UTC'
 
+# Task routing: short tasks clients wait on must not queue behind reports.
+# - interactive: add_numbers (a client is usually waiting on the result)
+# - batch: user processing
+# - reports: long-running generate_report / cleanup_old_data, on their own worker
+# Priorities use the Redis transport's convention: 0 is the highest. Set
+# CELERY_TASK_ROUTING=false to send everything to the default queue.
+CELERY_TASK_DEFAULT_QUEUE = 'interactive'
+CELERY_TASK_ROUTES = {
+    'hello.tasks.add_numbers': {'queue': 'interactive', 'priority': 0},
+    'hello.tasks.flush_user_batches': {'queue': 'batch', 'priority': 3},
+    'hello.tasks.process_user_data': {'queue': 'batch', 'priority': 3},
+    'hello.tasks.process_users_batch': {'queue': 'batch', 'priority': 6},
+    'hello.tasks.generate_report': {'queue': 'reports', 'priority': 6},
+    'hello.tasks.generate_report_parallel': {'queue': 'reports', 'priority': 6},
+    'hello.tasks.aggregate_report_part': {'queue': 'reports', 'priority': 6},
+    'hello.tasks.merge_report_parts': {'queue': 'reports', 'priority': 6},
+    'hello.tasks.release_report_lease': {'queue': 'reports', 'priority': 6},
+    'hello.tasks.cleanup_old_data': {'queue': 'reports', 'priority': 9},
+} if os.environ.get('CELERY_TASK_ROUTING', 'true').lower() == 'true' else {}
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    # One Redis list per queue and priority step
+    'priority_steps': [0, 3, 6, 9],
+    # Drain the queues in the order given to `worker -Q` instead of round-robin
+    'queue_order_strategy': 'priority',
+}
+# Prefetch is per worker; docker-compose.yaml overrides it per queue with
+# --prefetch-multiplier (4 for batch, 1 for interactive and reports)
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.environ.get('CELERY_WORKER_PREFETCH_MULTIPLIER', '1'))
+
+# process_user_data buffers ids in Redis and updates them in batches of up to
+# USER_BATCH_SIZE, at most USER_BATCH_INTERVAL_MS after the first id arrived
+USER_BATCH_REDIS_URL = os.environ.get('USER_BATCH_REDIS_URL', CELERY_BROKER_URL)
+USER_BATCH_SIZE = int(os.environ.get('USER_BATCH_SIZE', '500'))
+USER_BATCH_INTERVAL_MS = int(os.environ.get('USER_BATCH_INTERVAL_MS', '200'))
+
+# Waiting on task results (/api/tasks/<id>/wait/ and /events/), woken up by
+# the result backend's pub/sub. Timeouts and durations in seconds
+TASK_WAIT_DEFAULT_TIMEOUT = float(os.environ.get('TASK_WAIT_DEFAULT_TIMEOUT', '30'))
+TASK_WAIT_MAX_TIMEOUT = float(os.environ.get('TASK_WAIT_MAX_TIMEOUT', '60'))
+TASK_EVENTS_HEARTBEAT = float(os.environ.get('TASK_EVENTS_HEARTBEAT', '15'))
+TASK_EVENTS_MAX_SECONDS = float(os.environ.get('TASK_EVENTS_MAX_SECONDS', '300'))
+
 MIDDLEWARE = [
+    'hello.middleware.MongoCommandsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,6 +129,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'myproject.wsgi.application'
+ASGI_APPLICATION = 'myproject.asgi.application'
 
 
 # Database
@@ -97,8 +150,64 @@ MONGODB_SETTINGS = {
     'password': os.environ.get('MONGODB_PASSWORD', 'password123'),
     'database': 'django_app',
     'authSource': 'admin',
+    # Connection pool, per client and per process (gunicorn worker / Celery child).
+    # With gevent every greenlet shares the pool, so maxPoolSize caps concurrent
+    # MongoDB operations per worker; waitQueueTimeoutMS bounds the wait for a
+    # free connection (empty = wait forever). Unset values use PyMongo defaults.
+    'maxPoolSize': int(os.environ.get('MONGODB_MAX_POOL_SIZE', '100')),
+    'minPoolSize': int(os.environ.get('MONGODB_MIN_POOL_SIZE', '0')),
+    'waitQueueTimeoutMS': int(os.environ['MONGODB_WAIT_QUEUE_TIMEOUT_MS']) if os.environ.get('MONGODB_WAIT_QUEUE_TIMEOUT_MS') else None,
+    'maxIdleTimeMS': int(os.environ['MONGODB_MAX_IDLE_TIME_MS']) if os.environ.get('MONGODB_MAX_IDLE_TIME_MS') else None,
+    # Wire compression, e.g. "zstd,snappy,zlib" (zstd/snappy need extra packages)
+    'compressors': os.environ.get('MONGODB_COMPRESSORS', ''),
 }
 
+# Collection counters shown on the demo pages (see hello/db.py)
+# Estimated counts are cached per process for MONGO_COUNT_CACHE_TTL seconds;
+# set MONGO_EXACT_COUNTS=true (or pass ?exact=1) for full count_documents() scans
+MONGO_COUNT_CACHE_TTL = float(os.environ.get('MONGO_COUNT_CACHE_TTL', '5'))
+MONGO_EXACT_COUNTS = os.environ.get('MONGO_EXACT_COUNTS', 'false').lower() == 'true'
+
+# Per-request MongoDB command accounting (see hello/middleware.py): Server-Timing
+# header, and a warning logged for requests sending more than MONGO_COMMAND_BUDGET
+# commands (0 = no limit)
+MONGO_COMMAND_METRICS = os.environ.get('MONGO_COMMAND_METRICS', 'true').lower() == 'true'
+MONGO_COMMAND_BUDGET = int(os.environ.get('MONGO_COMMAND_BUDGET', '10'))
+
+# Reports older than this many days are removed by a TTL index (empty = keep forever)
+MONGO_REPORTS_TTL_DAYS = float(os.environ['MONGO_REPORTS_TTL_DAYS']) if os.environ.get('MONGO_REPORTS_TTL_DAYS') else None
+
+# cleanup_old_data deletes old blog posts CLEANUP_BATCH_SIZE at a time, pausing
+# CLEANUP_BATCH_PAUSE seconds between batches. With MONGO_POSTS_TTL_DAYS set, a
+# TTL index expires posts instead and the task does nothing.
+CLEANUP_BATCH_SIZE = int(os.environ.get('CLEANUP_BATCH_SIZE', '1000'))
+CLEANUP_BATCH_PAUSE = float(os.environ.get('CLEANUP_BATCH_PAUSE', '0.1'))
+MONGO_POSTS_TTL_DAYS = float(os.environ['MONGO_POSTS_TTL_DAYS']) if os.environ.get('MONGO_POSTS_TTL_DAYS') else None
+
+# generate_report aggregates documents created up to REPORT_WATERMARK_LAG seconds
+# ago (margin for in-flight inserts); REPORT_LEASE_SECONDS bounds a crashed run's lock
+REPORT_WATERMARK_LAG = int(os.environ.get('REPORT_WATERMARK_LAG', '5'))
+REPORT_LEASE_SECONDS = int(os.environ.get('REPORT_LEASE_SECONDS', '600'))
+# Time ranges per collection of generate_report_parallel (one subtask each)
+REPORT_PARALLEL_PARTS = int(os.environ.get('REPORT_PARALLEL_PARTS', '4'))
+
+# Keyset pagination for /api/users/ and /api/posts/
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', '100'))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', '1000'))
+# Documents per cursor batch / response chunk for ?stream=1 and NDJSON exports
+API_STREAM_BATCH_SIZE = int(os.environ.get('API_STREAM_BATCH_SIZE', '500'))
+# Documents per insert_many call for /api/users/bulk/ and /api/posts/bulk/
+API_BULK_CHUNK_SIZE = int(os.environ.get('API_BULK_CHUNK_SIZE', '1000'))
+
+# Redis cache for GET /api/users/ and /api/posts/ responses (see hello/cache.py)
+# Uses its own Redis database so it never mixes with Celery's keys
+API_CACHE_ENABLED = os.environ.get('API_CACHE_ENABLED', 'true').lower() == 'true'
+API_CACHE_URL = os.environ.get('API_CACHE_URL', 'redis://redis:6379/1')
+API_CACHE_TTL = int(os.environ.get('API_CACHE_TTL', '30'))
+# Max seconds a miss waits for a concurrent request building the same entry
+API_CACHE_LOCK_TIMEOUT = float(os.environ.get('API_CACHE_LOCK_TIMEOUT', '5'))
+API_CACHE_SOCKET_TIMEOUT = float(os.environ.get('API_CACHE_SOCKET_TIMEOUT', '0.5'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Celery payload size and (de)serialization cost per serializer.
+
+Encodes the task messages and result-backend entries this app produces
+(add_numbers, generate_report, a parallel report part, a failure) with
+json, msgpack and msgpackz (myproject/serialization.py), and reports bytes
+and encode/decode time. It first checks that payloads with non-str map keys
+survive a round trip.
+
+Needs kombu and msgpack, no running services:
+
+    python benchmarks/bench_celery_results.py
+
+With --redis, also stores --results copies of each result entry the way the
+Redis backend does (SETEX, under a throwaway key prefix that is deleted
+afterwards) and reports the Redis memory they take:
+
+    python benchmarks/bench_celery_results.py --redis redis://localhost:6379/15
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from kombu.serialization import dumps, loads, prepare_accept_content, register
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from myproject.serialization import CONTENT_TYPE, NAME, pack, unpack  # noqa: E402
+
+SERIALIZERS = ('json', 'msgpack', NAME)
+
+
+def task_body(args, kwargs):
+    """Message body of Celery's task protocol 2: (args, kwargs, embed)"""
+    return [list(args), kwargs, {'callbacks': None, 'errbacks': None, 'chain': None, 'chord': None}]
+
+
+def result_meta(result, status='SUCCESS', traceback=None):
+    """What RedisBackend stores under celery-task-meta-<id>"""
+    return {
+        'status': status,
+        'result': result,
+        'traceback': traceback,
+        'children': [],
+        'date_done': datetime.utcnow().isoformat(),
+        'task_id': str(uuid.uuid4()),
+    }
+
+
+def report_stats(authors, tags):
+    return {
+        'total_users': 125000,
+        'total_posts': 480000,
+        'new_users': 1200,
+        'new_posts': 5100,
+        'users_by_age': {'0-17': 4100, '18-24': 22000, '25-34': 40100, '35-44': 30050,
+                         '45-54': 17000, '55-64': 9000, '65+': 2750},
+        'top_authors': [{'author': f'Author {i}', 'count': 900 - i} for i in range(authors)],
+        'top_tags': [{'tag': f'tag-{i}', 'count': 4000 - i} for i in range(tags)],
+    }
+
+
+def payloads():
+    report = {'status': 'completed', 'report_type': 'daily',
+              'watermark': datetime.utcnow().isoformat(), 'stats': report_stats(10, 10)}
+    part = {'posts': 120000, 'users': 0, 'ages': {}}
+    failure = {'exc_type': 'ValueError', 'exc_message': ['bad user id'], 'exc_module': 'builtins'}
+    return [
+        ('add_numbers message', task_body((17, 25), {})),
+        ('add_numbers result', result_meta(42)),
+        ('process_users_batch message', task_body(([uuid.uuid4().hex[:24] for _ in range(500)],), {})),
+        ('generate_report result', result_meta(report)),
+        ('report part result', result_meta(part)),
+        ('failure result', result_meta(failure, 'FAILURE', 'Traceback (most recent call last):\n' * 20)),
+    ]
+
+
+# Payloads with non-str map keys: json turns the keys into strings, and
+# msgpack decoders reject them unless strict_map_key=False
+ROUND_TRIPS = [
+    ('int-keyed dict', task_body(({0: 12, 13: 7},), {'by_hour': {9: 'am', 21: 'pm'}})),
+]
+
+
+def check_round_trips():
+    """(label, serializer, outcome) of decoding each ROUND_TRIPS payload"""
+    results = []
+    for label, obj in ROUND_TRIPS:
+        for serializer in SERIALIZERS:
+            try:
+                decoded = decode(serializer, encode(serializer, obj))
+            except Exception as e:
+                outcome = f'FAILS: {type(e).__name__}: {e}'
+            else:
+                outcome = 'exact' if decoded == obj else 'keys changed'
+            results.append((label, serializer, outcome))
+    return results
+
+
+def register_msgpackz(threshold, level):
+    """Register msgpackz with explicit settings (the app reads them from Django settings)"""
+    register(NAME, lambda obj: pack(obj, threshold, level), unpack,
+             content_type=CONTENT_TYPE, content_encoding='binary')
+
+
+def encode(serializer, obj):
+    return dumps(obj, serializer=serializer)[2]
+
+
+def decode(serializer, data):
+    content_type = {'json': 'application/json', 'msgpack': 'application/x-msgpack', NAME: CONTENT_TYPE}[serializer]
+    encoding = 'utf-8' if serializer == 'json' else 'binary'
+    return loads(data, content_type, encoding, accept=prepare_accept_content(SERIALIZERS))
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def measure_redis(url, encoded, count, expires):
+    """Redis memory taken by `count` SETEX copies of each encoded entry"""
+    import redis
+
+    client = redis.Redis.from_url(url)
+    prefix = f'bench-celery-meta-{uuid.uuid4().hex[:8]}'
+    usage = {}
+    try:
+        for (label, serializer), data in encoded.items():
+            keys = [f'{prefix}:{serializer}:{label}:{i}' for i in range(count)]
+            before = client.info('memory')['used_memory']
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.setex(key, expires, data)
+            pipe.execute()
+            usage[label, serializer] = (client.info('memory')['used_memory'] - before) / count
+            client.delete(*keys)
+    finally:
+        leftovers = list(client.scan_iter(f'{prefix}:*'))
+        if leftovers:
+            client.delete(*leftovers)
+    return usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=2000, help='Encode/decode runs per payload (default: 2000)')
+    parser.add_argument('--threshold', type=int, default=1024, help='msgpackz compression threshold in bytes')
+    parser.add_argument('--level', type=int, default=6, help='msgpackz zlib level')
+    parser.add_argument('--redis', help='Redis URL to measure memory per stored result (uses SETEX)')
+    parser.add_argument('--results', type=int, default=2000, help='Copies per result stored with --redis')
+    parser.add_argument('--expires', type=int, default=3600, help='TTL of the stored copies (result_expires)')
+    args = parser.parse_args()
+
+    register_msgpackz(args.threshold, args.level)
+
+    round_trips = check_round_trips()
+    print('\nRound trips')
+    for label, serializer, outcome in round_trips:
+        print(f"  {label:<28} {serializer:<10} {outcome}")
+    if any(serializer == NAME and outcome != 'exact' for _, serializer, outcome in round_trips):
+        sys.exit(f'{NAME} does not round-trip every payload')
+
+    rows = []
+    encoded = {}
+    for label, obj in payloads():
+        for serializer in SERIALIZERS:
+            data = encode(serializer, obj)
+            encoded[label, serializer] = data
+            rows.append({
+                'label': label,
+                'serializer': serializer,
+                'bytes': len(data),
+                'encode_us': timed(lambda: encode(serializer, obj), args.repeat),
+                'decode_us': timed(lambda: decode(serializer, data), args.repeat),
+            })
+
+    redis_usage = {}
+    if args.redis:
+        redis_usage = measure_redis(
+            args.redis,
+            {key: data for key, data in encoded.items() if key[0].endswith('result')},
+            args.results, args.expires,
+        )
+
+    print(f"\nCelery payloads ({args.repeat} runs each, msgpackz threshold {args.threshold} bytes)\n")
+    header = f"{'Payload':<30} {'Serializer':<10} {'Bytes':>9} {'vs json':>8} {'Encode':>9} {'Decode':>9}"
+    if redis_usage:
+        header += f" {'Redis/key':>10}"
+    print(header)
+    print('─' * len(header))
+    json_bytes = {row['label']: row['bytes'] for row in rows if row['serializer'] == 'json'}
+    for row in rows:
+        line = (f"{row['label']:<30} {row['serializer']:<10} {row['bytes']:>9,} "
+                f"{row['bytes'] / json_bytes[row['label']]:>7.0%} "
+                f"{row['encode_us']:>7.1f}us {row['decode_us']:>7.1f}us")
+        if redis_usage:
+            used = redis_usage.get((row['label'], row['serializer']))
+            line += f" {used:>9,.0f}B" if used is not None else f" {'-':>10}"
+        print(line)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: BSON-to-JSON serialization of a page of MongoDB documents.
+
+Compares the original hello.models.serialize_document + JsonResponse-style
+encoding against hello/serializers.py on pages of blog post documents
+(nested metadata, tags, ObjectId and datetime values).
+
+Needs only pymongo's bson package, no running MongoDB:
+
+    python benchmarks/bench_serializers.py
+    python benchmarks/bench_serializers.py --docs 10000 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from hello.serializers import dumps_documents, jsonable_documents, orjson  # noqa: E402
+
+
+def legacy_serialize_document(doc):
+    """serialize_document as it was before hello/serializers.py (top-level only)"""
+    if doc is None:
+        return None
+
+    result = {}
+    for key, value in doc.items():
+        new_key = 'id' if key == '_id' else key
+
+        if isinstance(value, ObjectId):
+            result[new_key] = str(value)
+        elif isinstance(value, datetime):
+            result[new_key] = value.isoformat()
+        else:
+            result[new_key] = value
+    return result
+
+
+class LegacyEncoder(json.JSONEncoder):
+    """Stands in for DjangoJSONEncoder (datetime support) without importing Django"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def make_documents(count):
+    """Build blog post documents shaped like create_blog_post_document output"""
+    now = datetime(2025, 1, 1)
+    docs = []
+    for i in range(count):
+        docs.append({
+            '_id': ObjectId(),
+            'title': f'Benchmark Post {i}',
+            'content': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 4,
+            'author': f'Author {i % 100}',
+            'tags': ['mongodb', 'python', 'performance'][: 1 + i % 3],
+            'metadata': {
+                'views': i * 7,
+                'likes': i % 50,
+                'last_viewed': now + timedelta(seconds=i),
+            },
+            'created_at': now + timedelta(seconds=i),
+            'updated_at': now + timedelta(seconds=i),
+        })
+    return docs
+
+
+def legacy(docs, raw_bytes):
+    # Nested datetimes are handled by the encoder; nested Decimal128 would fail,
+    # so the legacy path is measured on the same documents minus 'price'
+    page = [legacy_serialize_document(d) for d in docs]
+    return json.dumps({'posts': page, 'count': len(page)}, cls=LegacyEncoder).encode()
+
+
+def jsonable(docs, raw_bytes):
+    page = jsonable_documents(docs)
+    return json.dumps({'posts': page, 'count': len(page)}).encode()
+
+
+def batch(docs, raw_bytes):
+    return dumps_documents(docs, key='posts', count=len(docs))
+
+
+def decode_then_batch(docs, raw_bytes):
+    """What the API actually pays with dict documents: BSON decode + encode"""
+    decoded = bson.decode_all(b''.join(raw_bytes), CodecOptions())
+    return dumps_documents(decoded, key='posts', count=len(decoded))
+
+
+def run(name, fn, make_docs, raw_bytes, repeat):
+    timings = []
+    for _ in range(repeat):
+        docs = make_docs()
+        start = time.perf_counter()
+        fn(docs, raw_bytes)
+        timings.append(time.perf_counter() - start)
+
+    # Peak memory is measured in a separate run: tracemalloc slows everything down
+    docs = make_docs()
+    tracemalloc.start()
+    fn(docs, raw_bytes)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'name': name,
+        'median_ms': statistics.median(timings) * 1000,
+        'min_ms': min(timings) * 1000,
+        'peak_kib': peak / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--docs', type=int, default=10000, help='Documents per page (default: 10000)')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per serializer (default: 10)')
+    args = parser.parse_args()
+
+    source = make_documents(args.docs)
+    raw_bytes = [bson.encode(d) for d in source]
+
+    def fresh_docs():
+        # Decoding gives every run its own documents (dumps_documents renames in place)
+        return bson.decode_all(b''.join(raw_bytes))
+
+    def fresh_docs_legacy():
+        docs = fresh_docs()
+        for d in docs:
+            d['metadata'].pop('price', None)
+        return docs
+
+    results = [
+        run('legacy serialize_document', legacy, fresh_docs_legacy, raw_bytes, args.repeat),
+        run('jsonable_documents + json', jsonable, fresh_docs, raw_bytes, args.repeat),
+        run('dumps_documents', batch, fresh_docs, raw_bytes, args.repeat),
+        run('BSON decode + dumps_documents', decode_then_batch, fresh_docs, raw_bytes, args.repeat),
+    ]
+
+    baseline = results[0]['median_ms']
+    print(f"\nSerializing {args.docs:,} documents per page ({args.repeat} runs, "
+          f"JSON backend: {'orjson' if orjson else 'json'})\n")
+    print(f"{'Serializer':<32} {'Median':>10} {'Min':>10} {'Peak mem':>11} {'Speedup':>8}")
+    print(f"{'─'*32} {'─'*10} {'─'*10} {'─'*11} {'─'*8}")
+    for r in results:
+        print(f"{r['name']:<32} {r['median_ms']:>8.1f}ms {r['min_ms']:>8.1f}ms "
+              f"{r['peak_kib']:>8.0f}KiB {baseline / r['median_ms']:>7.2f}x")
+    print()
+
+
+if __name__ == '__main__':
+    main()
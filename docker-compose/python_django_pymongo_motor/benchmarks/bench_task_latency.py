@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Celery end-to-end latency per task type under mixed load.
+
+Starts a burst of generate_report tasks, then keeps submitting add_numbers
+and process_user tasks at a steady rate while the reports are running. Each
+task is triggered through POST /api/tasks/trigger/ and awaited with
+/api/tasks/<id>/wait/, so the latency is submit -> result, queueing included.
+
+Needs the running docker compose stack and aiohttp. Compare the routed
+layout with everything on one queue:
+
+    python benchmarks/bench_task_latency.py
+    CELERY_TASK_ROUTING=false docker compose up -d   # one shared queue
+    python benchmarks/bench_task_latency.py
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+import aiohttp
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class TaskLatencyBenchmark:
+    def __init__(self, base_url, wait_timeout):
+        self.base_url = base_url.rstrip('/')
+        self.wait_timeout = wait_timeout
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def run_task(self, session, name, payload):
+        """Submit one task and wait for its result; records the latency under `name`"""
+        start = time.perf_counter()
+        try:
+            async with session.post(f'{self.base_url}/api/tasks/trigger/', json=payload) as response:
+                body = await response.json()
+                if response.status != 202:
+                    self.errors[name] += 1
+                    return
+            task_id = body['task_id']
+            while True:
+                url = f'{self.base_url}/api/tasks/{task_id}/wait/?timeout={self.wait_timeout}'
+                async with session.get(url) as response:
+                    status = await response.json()
+                if status.get('ready'):
+                    break
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError):
+            self.errors[name] += 1
+            return
+        if status['status'] != 'SUCCESS':
+            self.errors[name] += 1
+        self.latencies[name].append(time.perf_counter() - start)
+
+    async def user_ids(self, session, count):
+        url = f'{self.base_url}/api/users/?page_size={count}&fields=_id'
+        async with session.get(url) as response:
+            body = await response.json()
+        return [user['id'] for user in body.get('users', [])]
+
+    async def run(self, reports, duration, rate, mix):
+        timeout = aiohttp.ClientTimeout(total=None)
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            ids = await self.user_ids(session, 100)
+            if not ids:
+                mix = {name: weight for name, weight in mix.items() if name != 'process_user'}
+                print('No users found, process_user tasks are skipped')
+                if not mix:
+                    return
+
+            pending = [
+                asyncio.create_task(self.run_task(
+                    session, 'report', {'task_type': 'report', 'report_type': f'bench-{i}'}
+                ))
+                for i in range(reports)
+            ]
+
+            names, weights = zip(*mix.items())
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                name = random.choices(names, weights)[0]
+                if name == 'add':
+                    payload = {'task_type': 'add', 'x': random.randint(0, 100), 'y': random.randint(0, 100)}
+                else:
+                    payload = {'task_type': 'process_user', 'user_id': random.choice(ids)}
+                pending.append(asyncio.create_task(self.run_task(session, name, payload)))
+                await asyncio.sleep(random.expovariate(rate))
+
+            await asyncio.gather(*pending)
+
+    def print_results(self):
+        print()
+        print(f"{'Task':<15} {'Count':>6} {'Errors':>6} {'P50 (s)':>8} {'P95 (s)':>8} "
+              f"{'P99 (s)':>8} {'Max (s)':>8}")
+        print('-' * 65)
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies[name])
+            row = [percentile(values, pct) for pct in (50, 95, 99)] + [values[-1] if values else None]
+            cells = ' '.join(f'{v:>8.2f}' if v is not None else f"{'-':>8}" for v in row)
+            print(f'{name:<15} {len(values):>6} {self.errors[name]:>6} {cells}')
+        all_values = [v for values in self.latencies.values() for v in values]
+        if all_values:
+            print(f'\nMean latency over all tasks: {statistics.mean(all_values):.2f}s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000', help='Base URL of the app')
+    parser.add_argument('--reports', type=int, default=6, help='generate_report tasks started at once')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of short-task traffic')
+    parser.add_argument('--rate', type=float, default=2, help='Short tasks submitted per second (Poisson)')
+    parser.add_argument('--add-weight', type=float, default=1, help='Share of add_numbers tasks')
+    parser.add_argument('--user-weight', type=float, default=1, help='Share of process_user tasks')
+    parser.add_argument('--wait-timeout', type=float, default=30, help='?timeout= of each /wait/ call')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    mix = {'add': args.add_weight, 'process_user': args.user_weight}
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+    if not mix:
+        parser.error('at least one of --add-weight / --user-weight must be positive')
+
+    print(f'{args.reports} reports + {args.rate}/s short tasks for {args.duration:.0f}s against {args.url}')
+    benchmark = TaskLatencyBenchmark(args.url, args.wait_timeout)
+    try:
+        asyncio.run(benchmark.run(args.reports, args.duration, args.rate, mix))
+    except KeyboardInterrupt:
+        sys.exit(1)
+    benchmark.print_results()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hello.views in-process, without the docker compose stack.
+
+Requests go through Django's test client (URL routing, middleware, views,
+templates) against local stand-ins: mongomock + mongomock_motor (or a local
+mongod with --mongo-uri), fakeredis for the API cache and user batching, and
+eager Celery (tasks run inline, so their MongoDB work is counted too). For
+each view it reports the latency distribution, the MongoDB commands per
+request and the memory allocated per request (tracemalloc, in a separate
+pass so tracing does not inflate the latencies).
+
+Needs the app requirements plus the stand-ins:
+
+    pip install mongomock mongomock-motor fakeredis
+    python benchmarks/bench_views.py
+    python benchmarks/bench_views.py --filter api_ --iterations 500
+    python benchmarks/bench_views.py --mongo-uri mongodb://localhost:27017
+
+mongomock latencies are not MongoDB's: compare runs with each other (before
+and after a serializer, query or caching change), and check command counts,
+which are the same as with a real server.
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.insert(0, APP_DIR)
+
+# Before Django reads the settings: no broker or result backend to reach
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
+os.environ['CELERY_BROKER_URL'] = 'memory://'
+os.environ['CELERY_RESULT_BACKEND'] = 'cache+memory://'
+
+import django  # noqa: E402
+
+# Collection methods counted as one command each with mongomock (the
+# outermost call only: mongomock implements some of them with the others)
+MONGOMOCK_COMMANDS = (
+    'find', 'find_one', 'insert_one', 'insert_many', 'update_one', 'update_many',
+    'replace_one', 'delete_one', 'delete_many', 'bulk_write', 'aggregate',
+    'count_documents', 'estimated_document_count', 'distinct',
+    'find_one_and_update', 'find_one_and_replace', 'find_one_and_delete',
+    'create_index', 'create_indexes', 'list_indexes', 'index_information',
+)
+
+
+class CommandCounter:
+    """MongoDB commands by name: a pymongo CommandListener, or mongomock method hooks"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._local = threading.local()
+
+    # pymongo.monitoring.CommandListener interface (real server)
+    def started(self, event):
+        self.counts[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def hook_mongomock(self):
+        import mongomock.collection
+
+        def counted(name, method):
+            def wrapper(collection, *args, **kwargs):
+                depth = getattr(self._local, 'depth', 0)
+                if not depth:
+                    self.counts[name] += 1
+                self._local.depth = depth + 1
+                try:
+                    return method(collection, *args, **kwargs)
+                finally:
+                    self._local.depth = depth
+            return wrapper
+
+        for name in MONGOMOCK_COMMANDS:
+            method = getattr(mongomock.collection.Collection, name, None)
+            if method is not None:
+                setattr(mongomock.collection.Collection, name, counted(name, method))
+
+    def total(self):
+        return sum(self.counts.values())
+
+
+def setup_stand_ins(counter, mongo_uri, users, posts):
+    """Point the app at local stand-ins and seed the collections"""
+    django.setup()
+
+    import fakeredis
+    import redis
+    from celery import current_app
+    from django.conf import settings
+    from hello import db as hello_db
+    from hello.indexes import ensure_indexes
+    from hello.management.commands.seed_mongo import generate_posts, generate_users
+
+    # One in-memory Redis for every client the app creates (cache, batching)
+    server = fakeredis.FakeServer()
+    redis.Redis.from_url = classmethod(
+        lambda cls, url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs)
+    )
+
+    current_app.conf.task_always_eager = True
+
+    if mongo_uri:
+        from pymongo import MongoClient
+
+        settings.MONGODB_SETTINGS['database'] = f'bench_views_{uuid.uuid4().hex[:8]}'
+        hello_db._mongo_client = MongoClient(mongo_uri, event_listeners=[counter])
+        hello_db._motor_client = hello_db._LoopAgnosticMotorClient(mongo_uri, event_listeners=[counter])
+    else:
+        import mongomock
+        import mongomock.collection
+        from mongomock_motor import AsyncMongoMockClient
+
+        # pymongo 4.9+ passes sort= to UpdateOne, which mongomock does not know
+        add_update = mongomock.collection.BulkOperationBuilder.add_update
+        mongomock.collection.BulkOperationBuilder.add_update = (
+            lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs)
+        )
+        counter.hook_mongomock()
+        hello_db._mongo_client = mongomock.MongoClient()
+        hello_db._motor_client = AsyncMongoMockClient(mock_mongo_client=hello_db._mongo_client)
+
+    db = hello_db.get_mongo_db()
+    ensure_indexes(db)
+    if users:
+        db.users.insert_many(list(generate_users(users)))
+    if posts:
+        db.blog_posts.insert_many(list(generate_posts(posts, users)))
+    return db
+
+
+def cases(user_id):
+    """(name, method, path, body, settings overrides); `body` may take the iteration number"""
+    def user(i):
+        return {'name': f'Bench User {i}', 'email': f'bench-{uuid.uuid4().hex}@example.com', 'age': 30}
+
+    def post(i):
+        return {'title': f'Bench Post {i}', 'content': 'Benchmark post body. ' * 20,
+                'author': f'Bench User {i}', 'tags': ['bench', 'python'], 'metadata': {'views': i}}
+
+    def users_bulk(i):
+        return '\n'.join(json.dumps(user(i)) for _ in range(20))
+
+    no_cache = {'API_CACHE_ENABLED': False}
+    return [
+        ('index', 'GET', '/', None, {}),
+        ('hello_html', 'GET', '/hello/', None, {}),
+        ('mongodb_sync_demo', 'GET', '/sync/', None, {}),
+        ('mongodb_sync_demo ?exact=1', 'GET', '/sync/?exact=1', None, {}),
+        ('mongodb_async_demo', 'GET', '/async/', None, {}),
+        ('celery_demo', 'GET', '/celery/', None, {}),
+        ('api_users (cache hit)', 'GET', '/api/users/', None, {}),
+        ('api_users (no cache)', 'GET', '/api/users/', None, no_cache),
+        ('api_users fields=all (no cache)', 'GET', '/api/users/?fields=all', None, no_cache),
+        ('api_posts (cache hit)', 'GET', '/api/posts/', None, {}),
+        ('api_posts (no cache)', 'GET', '/api/posts/', None, no_cache),
+        ('api_posts page_size=100 (no cache)', 'GET', '/api/posts/?page_size=100', None, no_cache),
+        ('api_users POST', 'POST', '/api/users/', user, {}),
+        ('api_posts POST', 'POST', '/api/posts/', post, {}),
+        ('api_users_bulk POST (20 rows)', 'POST', '/api/users/bulk/', users_bulk, {}),
+        ('api_trigger_task process_user', 'POST', '/api/tasks/trigger/',
+         {'task_type': 'process_user', 'user_id': user_id}, {}),
+        ('api_mongo_metrics', 'GET', '/api/metrics/mongo/', None, {}),
+    ]
+
+
+def request(client, method, path, body, i):
+    if callable(body):
+        body = body(i)
+    if method == 'GET':
+        return client.get(path)
+    if isinstance(body, str):
+        return client.post(path, body, content_type='application/x-ndjson')
+    return client.post(path, json.dumps(body), content_type='application/json')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_case(client, counter, case, iterations, warmup, alloc_iterations):
+    from django.test import override_settings
+
+    name, method, path, body, overrides = case
+    with override_settings(**overrides):
+        for i in range(warmup):
+            response = request(client, method, path, body, i)
+        if warmup and response.status_code >= 400:
+            raise RuntimeError(f'{name}: {method} {path} returned {response.status_code}')
+
+        counter.counts.clear()
+        timings = []
+        for i in range(iterations):
+            start = time.perf_counter()
+            response = request(client, method, path, body, warmup + i)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append(time.perf_counter() - start)
+        commands = Counter({command: count / iterations for command, count in counter.counts.items()})
+
+        # Allocation pass: peak traced memory per request above what was
+        # allocated before it, and blocks still allocated after all of them
+        peaks = []
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for i in range(alloc_iterations):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            request(client, method, path, body, warmup + iterations + i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+
+    timings.sort()
+    return {
+        'name': name,
+        'status': response.status_code,
+        'mean_ms': statistics.mean(timings) * 1000,
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p95_ms': percentile(timings, 95) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+        'max_ms': timings[-1] * 1000,
+        'commands': sum(commands.values()),
+        'command_names': commands,
+        'peak_kb': statistics.mean(peaks) / 1024 if peaks else 0.0,
+        'retained_blocks': retained / alloc_iterations if alloc_iterations else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200, help='Timed requests per view (default: 200)')
+    parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per view first (default: 20)')
+    parser.add_argument('--alloc-iterations', type=int, default=20,
+                        help='Requests per view traced with tracemalloc (default: 20, 0 to skip)')
+    parser.add_argument('--users', type=int, default=1000, help='Users seeded before the run')
+    parser.add_argument('--posts', type=int, default=1000, help='Blog posts seeded before the run')
+    parser.add_argument('--filter', default='', help='Only views whose name contains this text')
+    parser.add_argument('--mongo-uri', help='Use this MongoDB (a throwaway database) instead of mongomock')
+    parser.add_argument('--commands', action='store_true', help='Also list the commands of each view')
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    db = setup_stand_ins(counter, args.mongo_uri, args.users, args.posts)
+
+    from django.test import Client
+
+    client = Client()
+    user_id = str(db.users.find_one({}, {'_id': 1})['_id'])
+    selected = [case for case in cases(user_id) if args.filter in case[0]]
+    backend = 'MongoDB ' + args.mongo_uri if args.mongo_uri else 'mongomock'
+    print(f'\n{len(selected)} views, {args.iterations} requests each ({backend}, '
+          f'{args.users} users, {args.posts} posts)\n')
+
+    header = (f"{'View':<38} {'Mean':>7} {'P50':>7} {'P95':>7} {'P99':>7} {'Max':>7} "
+              f"{'Cmds':>6} {'Peak KB':>8} {'Blocks':>7}")
+    print(header)
+    print('─' * len(header))
+    try:
+        for case in selected:
+            row = run_case(client, counter, case, args.iterations, args.warmup, args.alloc_iterations)
+            print(f"{row['name']:<38} "
+                  + ' '.join(f"{row[key]:>5.2f}ms" for key in ('mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'))
+                  + f" {row['commands']:>6.1f} {row['peak_kb']:>8.1f} {row['retained_blocks']:>7.1f}")
+            if args.commands:
+                for command, count in row['command_names'].most_common():
+                    print(f"    {command:<34} {count:>6.1f}")
+    finally:
+        if args.mongo_uri:
+            db.client.drop_database(db.name)
+
+    print('\nCmds: MongoDB commands per request. Peak KB: peak memory allocated during a request.')
+    print('Blocks: allocations per request still alive afterwards; the test client itself keeps a few')
+    print('dozen (see index), more than that is a leak or a cache filling up.\n')
+
+
+if __name__ == '__main__':
+    main()
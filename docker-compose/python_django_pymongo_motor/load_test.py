@@ -11,6 +11,9 @@ Simulates heavy production traffic with:
 Usage:
     python load_test.py --users 50 --duration 60
     python load_test.py --quick  # Quick test with default settings
+    python load_test.py --rps 200 --arrival poisson  # Open model: fixed arrival rate
+    python load_test.py --users 400 --processes 4  # Spread users over 4 processes
+    python load_test.py --scenario flask_items  # Another app (see scenarios/)
 """
 
 import argparse
@@ -18,45 +21,411 @@ import asyncio
 import aiohttp
 import time
 import random
-import statistics
+import uuid
+import os
+import csv
+import json
+import math
+import re
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 from typing import List, Dict, Any
 from datetime import datetime
 from collections import defaultdict
+import heapq
+import itertools
+
+
+class LatencyHistogram:
+    """
+    Fixed-size, log-linear latency histogram (HDR-style).
+
+    Values are recorded in microseconds. Below 2**SIGNIFICANT_BITS they get a
+    bucket each; above, every power of two is split into 2**(SIGNIFICANT_BITS - 1)
+    equal buckets, so a bucket is never wider than ~0.8% of its values.
+    Recording is O(1) and memory is the same however many requests are
+    recorded; histograms with the same layout merge by adding counts.
+    """
+    SIGNIFICANT_BITS = 8
+    # Largest trackable value: 2**36 us (~19 hours); larger values are clamped
+    MAX_BITS = 36
+    
+    def __init__(self):
+        self.counts = [0] * (self._index((1 << self.MAX_BITS) - 1) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+    
+    @classmethod
+    def _index(cls, value: int) -> int:
+        shift = max(value.bit_length() - cls.SIGNIFICANT_BITS, 0)
+        return (shift << (cls.SIGNIFICANT_BITS - 1)) + (value >> shift)
+    
+    @classmethod
+    def _bucket_bounds(cls, index: int):
+        """(lowest, highest) microsecond value of a bucket"""
+        half = 1 << (cls.SIGNIFICANT_BITS - 1)
+        if index < 2 * half:
+            return index, index
+        shift = (index >> (cls.SIGNIFICANT_BITS - 1)) - 1
+        low = (index - (shift << (cls.SIGNIFICANT_BITS - 1))) << shift
+        return low, low + (1 << shift) - 1
+    
+    def record(self, seconds: float):
+        value = min(max(int(seconds * 1_000_000), 0), (1 << self.MAX_BITS) - 1)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+    
+    def merge(self, other: 'LatencyHistogram'):
+        """Add another histogram's recordings to this one"""
+        if not other.count:
+            return self
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+    
+    def percentile(self, pct: float) -> float:
+        """Value (seconds) at or below which `pct` percent of recordings fall"""
+        if not self.count:
+            return 0.0
+        rank = max(1, -(-self.count * pct // 100))  # ceil, nearest-rank
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                # Highest value of the bucket, but never above the exact max
+                return min(self._bucket_bounds(index)[1], self.max) / 1_000_000
+        return self.max / 1_000_000
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count / 1_000_000 if self.count else 0.0
+    
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'avg': self.mean,
+            'min': (self.min or 0) / 1_000_000,
+            'max': (self.max or 0) / 1_000_000,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'p99.9': self.percentile(99.9),
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact, JSON/pickle-friendly form (non-empty buckets only)"""
+        return {
+            'significant_bits': self.SIGNIFICANT_BITS,
+            'counts': {index: count for index, count in enumerate(self.counts) if count},
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        if data['significant_bits'] != cls.SIGNIFICANT_BITS:
+            raise ValueError('Histogram was recorded with a different bucket layout')
+        histogram = cls()
+        for index, count in data['counts'].items():
+            histogram.counts[int(index)] = count
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
+
+
+# Placeholders of scenario templates: {name} or {name:argument}
+PLACEHOLDER = re.compile(r'\{(\w+)(?::([^{}]*))?\}')
+
+
+def _random_number(kind, arg):
+    low, high = arg.split(':')
+    if kind == 'randint':
+        return random.randint(int(low), int(high))
+    return random.uniform(float(low), float(high))
+
+
+# Generated values, {name:argument} -> value
+TEMPLATE_FUNCTIONS = {
+    'uuid': lambda arg: uuid.uuid4().hex[:int(arg)] if arg else uuid.uuid4().hex,
+    'randint': lambda arg: _random_number('randint', arg),
+    'uniform': lambda arg: _random_number('uniform', arg),
+    'choice': lambda arg: random.choice(arg.split('|')),
+    'now': lambda arg: datetime.now().isoformat() if arg == 'iso' else str(datetime.now()),
+}
+
+
+def render(template: Any, context: Dict[str, Any]) -> Any:
+    """
+    Fill the placeholders of a template (strings, nested in dicts and lists)
+    from `context` or TEMPLATE_FUNCTIONS. A string that is a single
+    placeholder keeps the value's type, e.g. "{randint:18:65}" gives an int.
+    """
+    if isinstance(template, dict):
+        return {key: render(value, context) for key, value in template.items()}
+    if isinstance(template, list):
+        return [render(value, context) for value in template]
+    if not isinstance(template, str):
+        return template
+    
+    def value(match):
+        name, arg = match.groups()
+        if name in context:
+            return context[name]
+        if name in TEMPLATE_FUNCTIONS:
+            return TEMPLATE_FUNCTIONS[name](arg)
+        raise ValueError(f"unknown placeholder {match.group(0)} in {template!r}")
+    
+    whole = PLACEHOLDER.fullmatch(template)
+    if whole:
+        return value(whole)
+    return PLACEHOLDER.sub(lambda match: str(value(match)), template)
+
+
+class Scenario:
+    """
+    Workloads of one app, from a YAML or JSON scenario file (see scenarios/
+    and LOAD_TEST_GUIDE.md): weighted mixes of workloads, each a list of
+    request steps with templated payloads and think times.
+    """
+    BUNDLED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios')
+    DEFAULT = 'pymongo_motor'
+    
+    REQUEST_KEYS = {'name', 'method', 'path', 'query', 'json', 'headers', 'weight'}
+    STEP_KEYS = REQUEST_KEYS | {'choice', 'think_time'}
+    
+    def __init__(self, data: Dict[str, Any], path: str = '', variables: Dict[str, Any] = None):
+        self.path = path
+        self.name = data.get('name') or os.path.splitext(os.path.basename(path))[0]
+        self.description = data.get('description', '')
+        self.base_url = data.get('base_url', 'http://localhost:8000')
+        # Pause between two sessions of a user (closed model)
+        self.think_time = data.get('think_time', 0)
+        self.variables = {**(data.get('variables') or {}), **(variables or {})}
+        self.workloads = data.get('workloads') or {}
+        self.default_workload = data.get('default_workload') or next(iter(self.workloads), None)
+        self.validate()
+    
+    @classmethod
+    def bundled(cls) -> List[str]:
+        return sorted(
+            os.path.splitext(name)[0] for name in os.listdir(cls.BUNDLED_DIR)
+            if name.endswith(('.yaml', '.yml', '.json'))
+        )
+    
+    @classmethod
+    def load(cls, name_or_path: str, variables: Dict[str, Any] = None) -> 'Scenario':
+        """Load a scenario file, or a bundled scenario by name"""
+        path = name_or_path
+        if not os.path.exists(path):
+            for extension in ('.yaml', '.yml', '.json'):
+                candidate = os.path.join(cls.BUNDLED_DIR, name_or_path + extension)
+                if os.path.exists(candidate):
+                    path = candidate
+                    break
+            else:
+                raise ValueError(f"no scenario {name_or_path!r} (bundled: {', '.join(cls.bundled())})")
+        
+        with open(path) as f:
+            if path.endswith('.json'):
+                data = json.load(f)
+            else:
+                try:
+                    import yaml
+                except ImportError:
+                    raise ValueError('YAML scenarios need PyYAML (make install-loadtest), '
+                                     'or use a .json scenario')
+                try:
+                    data = yaml.safe_load(f)
+                except yaml.YAMLError as e:
+                    raise ValueError(f'{path}: {e}')
+        if not isinstance(data, dict):
+            raise ValueError(f'{path}: expected a mapping at the top level')
+        return cls(data, path, variables)
+    
+    def validate(self):
+        """Check the structure once, and render every request, so mistakes fail before the run"""
+        def fail(message):
+            raise ValueError(f'{self.path or self.name}: {message}')
+        
+        if not self.workloads:
+            fail('no workloads')
+        if self.default_workload not in self.workloads:
+            fail(f'default_workload {self.default_workload!r} is not a workload')
+        self.sample(self.think_time)
+        for name, spec in self.workloads.items():
+            if 'mix' in spec:
+                for member in spec['mix']:
+                    if 'steps' not in self.workloads.get(member, {}):
+                        fail(f'mix of {name!r}: {member!r} is not a workload with steps')
+                continue
+            if not spec.get('steps'):
+                fail(f'workload {name!r} has neither steps nor a mix')
+            self.repeat_count(spec)
+            for step in spec['steps']:
+                unknown = set(step) - self.STEP_KEYS
+                if unknown:
+                    fail(f'workload {name!r}: unknown step keys {sorted(unknown)}')
+                self.sample(step.get('think_time'))
+                for option in step.get('choice') or [{}]:
+                    request = self.pick_option(step, option)
+                    if 'path' not in request or set(option) - self.REQUEST_KEYS:
+                        fail(f'workload {name!r}: a request needs a path and only {sorted(self.REQUEST_KEYS)}')
+                    try:
+                        self.render_request(request, 0)
+                    except (ValueError, TypeError) as e:
+                        fail(f'workload {name!r}: {e}')
+    
+    @staticmethod
+    def sample(spec: Any) -> float:
+        """
+        Seconds of a think time: a number, or one of {constant: s},
+        {uniform: [min, max]}, {exponential: mean}, {normal: [mean, stddev]}
+        """
+        if not spec:
+            return 0.0
+        if isinstance(spec, (int, float)):
+            return float(spec)
+        if isinstance(spec, dict) and len(spec) == 1:
+            (kind, params), = spec.items()
+            if kind == 'constant':
+                return float(params)
+            if kind == 'uniform':
+                return random.uniform(*params)
+            if kind == 'exponential':
+                return random.expovariate(1 / params)
+            if kind == 'normal':
+                return max(random.gauss(*params), 0.0)
+        raise ValueError(f'unknown think time {spec!r}')
+    
+    @staticmethod
+    def repeat_count(spec: Dict[str, Any]) -> int:
+        """How many times a session runs its steps: `repeat`, a number or {randint: [min, max]}"""
+        repeat = spec.get('repeat', 1)
+        if isinstance(repeat, int):
+            return repeat
+        if isinstance(repeat, dict) and list(repeat) == ['randint']:
+            return random.randint(*repeat['randint'])
+        raise ValueError(f'unknown repeat {repeat!r}')
+    
+    def pick_workload(self, name: str):
+        """(name, spec) of a workload; a mix is resolved to one of its workloads (weighted)"""
+        spec = self.workloads[name]
+        if 'mix' in spec:
+            name = random.choices(list(spec['mix']), weights=list(spec['mix'].values()), k=1)[0]
+            spec = self.workloads[name]
+        return name, spec
+    
+    @staticmethod
+    def pick_option(step: Dict[str, Any], option: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        The request of a step. For a `choice`, one of its options (weighted,
+        or `option`) on top of the request keys of the step itself.
+        """
+        if 'choice' not in step:
+            return step
+        if option is None:
+            options = step['choice']
+            option = random.choices(options, weights=[option.get('weight', 1) for option in options], k=1)[0]
+        return {**{key: step[key] for key in step if key in Scenario.REQUEST_KEYS}, **option}
+    
+    def render_request(self, request: Dict[str, Any], user_id: int):
+        """(name, method, endpoint, json, headers) of a request step"""
+        context = {**self.variables, 'user_id': user_id}
+        method = request.get('method', 'GET').upper()
+        endpoint = render(request['path'], context)
+        query = render(request.get('query', ''), context)
+        if query:
+            endpoint = f'{endpoint}?{query}'
+        if 'name' in request:
+            name = render(request['name'], context)
+        else:
+            name = endpoint if method == 'GET' else f'{endpoint} ({method})'
+        return name, method, endpoint, render(request.get('json'), context), render(request.get('headers'), context)
+    
+    def next_request(self, workload: str, seq: int):
+        """
+        One request of a workload for the open model: a workload of the mix,
+        one of its steps (by `weight`, default 1), one option of a choice.
+        `seq` stands in for the user id in templates.
+        """
+        _, spec = self.pick_workload(workload)
+        steps = spec['steps']
+        step = random.choices(steps, weights=[step.get('weight', 1) for step in steps], k=1)[0]
+        return self.render_request(self.pick_option(step), seq)
 
 
 class LoadTester:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    # Error messages kept per process (the rest are only counted)
+    MAX_ERRORS = 100
+    # A process past either limit measures itself rather than the server
+    SATURATED_CPU_PERCENT = 90
+    SATURATED_LOOP_LAG = 0.05
+    
+    def __init__(self, base_url: str, scenario: 'Scenario', connections: int = 100,
+                 timeline_spool: str = None):
         self.base_url = base_url
-        self.results = defaultdict(list)
+        self.scenario = scenario
+        self.connections = connections
+        self.timeline_spool = timeline_spool
+        self.results = defaultdict(LatencyHistogram)
+        self.response_bytes = defaultdict(int)
         self.errors = []
         self.total_requests = 0
         self.successful_requests = 0
         self.failed_requests = 0
+        self.dropped_errors = 0
+        # Open model only: scheduling delay of each request, and the rates
+        self.send_lag = LatencyHistogram()
+        self.rate_info = None
+        # Load generator health, per process
+        self.loop_lag = LatencyHistogram()
+        self.client_stats = []
+        # --timeseries only: histograms of the current second, {second: {name:
+        # {'latency', 'errors'}}}, appended to the timeline_spool file (JSON
+        # lines) once the second is over; seconds count from timeline_start (time.time())
+        self.timeline = defaultdict(dict)
+        self.timeline_second = 0
+        self.timeline_file = None
+        self.timeline_start = None
         
     async def make_request(self, session: aiohttp.ClientSession, method: str, 
-                          endpoint: str, json_data: Dict = None) -> Dict[str, Any]:
-        """Make a single HTTP request and record metrics"""
-        start_time = time.time()
+                          endpoint: str, json_data: Any = None,
+                          scheduled_at: float = None, headers: Dict[str, str] = None) -> Dict[str, Any]:
+        """
+        Make a single HTTP request and record metrics.
+        
+        `scheduled_at` (a time.perf_counter() value) is when the request
+        should have been sent; the response time is then measured from it,
+        so a late start counts (coordinated-omission correction).
+        """
+        start_time = time.perf_counter() if scheduled_at is None else scheduled_at
         url = f"{self.base_url}{endpoint}"
         
         try:
-            if method == "GET":
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                    response_time = time.time() - start_time
-                    status = response.status
-                    try:
-                        data = await response.json()
-                    except:
-                        data = await response.text()
-            else:  # POST
-                async with session.post(url, json=json_data, 
+            async with session.request(method, url, json=json_data, headers=headers,
                                        timeout=aiohttp.ClientTimeout(total=30)) as response:
-                    response_time = time.time() - start_time
-                    status = response.status
-                    try:
-                        data = await response.json()
-                    except:
-                        data = await response.text()
+                body = await response.read()
+                response_time = time.perf_counter() - start_time
+                status = response.status
             
             self.total_requests += 1
             if status < 400:
@@ -69,11 +438,12 @@ class LoadTester:
                 'method': method,
                 'status': status,
                 'response_time': response_time,
+                'bytes': len(body),
                 'success': status < 400
             }
             
         except Exception as e:
-            response_time = time.time() - start_time
+            response_time = time.perf_counter() - start_time
             self.total_requests += 1
             self.failed_requests += 1
             self.errors.append(f"{endpoint}: {str(e)}")
@@ -82,143 +452,250 @@ class LoadTester:
                 'method': method,
                 'status': 0,
                 'response_time': response_time,
+                'bytes': 0,
                 'success': False,
                 'error': str(e)
             }
     
-    async def user_browsing_session(self, session: aiohttp.ClientSession, user_id: int):
-        """Simulate a user browsing the application"""
-        endpoints = [
-            ('GET', '/'),
-            ('GET', '/hello/'),
-            ('GET', '/sync/'),
-            ('GET', '/async/'),
-            ('GET', '/celery/'),
-        ]
+    def record(self, name: str, result: Dict[str, Any]):
+        """Record a request's response time and body size under `name`"""
+        self.results[name].record(result['response_time'])
+        self.response_bytes[name] += result['bytes']
+        if self.timeline_file:
+            second = max(int(time.time() - self.timeline_start), self.timeline_second)
+            if second > self.timeline_second:
+                self.flush_timeline(before=second)
+                self.timeline_second = second
+            interval = self.timeline[second].get(name)
+            if interval is None:
+                interval = self.timeline[second][name] = {'latency': LatencyHistogram(), 'errors': 0}
+            interval['latency'].record(result['response_time'])
+            if not result['success']:
+                interval['errors'] += 1
+    
+    def flush_timeline(self, before: int = None):
+        """Spool the seconds before `before` (all if None) and forget them"""
+        for second in sorted(self.timeline):
+            if before is not None and second >= before:
+                break
+            intervals = self.timeline.pop(second)
+            self.timeline_file.write(json.dumps({
+                'second': second,
+                'intervals': {
+                    name: {'latency': interval['latency'].to_dict(), 'errors': interval['errors']}
+                    for name, interval in intervals.items()
+                },
+            }) + '\n')
+    
+    async def run_session(self, session: aiohttp.ClientSession, workload: str, user_id: int):
+        """One session of a workload: its steps in order (repeated), with their think times"""
+        workload, spec = self.scenario.pick_workload(workload)
+        for _ in range(self.scenario.repeat_count(spec)):
+            for step in spec['steps']:
+                name, method, endpoint, json_data, headers = self.scenario.render_request(
+                    self.scenario.pick_option(step), user_id
+                )
+                result = await self.make_request(session, method, endpoint, json_data, headers=headers)
+                self.record(name, result)
+                pause = Scenario.sample(step.get('think_time'))
+                if pause:
+                    await asyncio.sleep(pause)
+    
+    async def run_user(self, session: aiohttp.ClientSession, user_id: int, duration: int,
+                       workload_type: str):
+        """Simulate a single user for the specified duration"""
+        end_time = time.time() + duration
         
-        for method, endpoint in endpoints:
-            result = await self.make_request(session, method, endpoint)
-            self.results[endpoint].append(result['response_time'])
-            await asyncio.sleep(random.uniform(0.1, 0.5))  # Think time
-    
-    async def api_read_operations(self, session: aiohttp.ClientSession, user_id: int):
-        """Simulate API read operations"""
-        endpoints = [
-            '/api/users/',
-            '/api/posts/',
-        ]
+        while time.time() < end_time:
+            try:
+                await self.run_session(session, workload_type, user_id)
+                await asyncio.sleep(Scenario.sample(self.scenario.think_time))
+            except Exception as e:
+                self.errors.append(f"User {user_id}: {str(e)}")
+    
+    async def scheduled_request(self, session: aiohttp.ClientSession, scheduled_at: float,
+                                workload_type: str, seq: int):
+        name, method, endpoint, json_data, headers = self.scenario.next_request(workload_type, seq)
+        # How late the generator itself is; large values mean the client, not
+        # the server, is saturated
+        self.send_lag.record(max(time.perf_counter() - scheduled_at, 0))
+        result = await self.make_request(session, method, endpoint, json_data,
+                                         scheduled_at=scheduled_at, headers=headers)
+        self.record(name, result)
+    
+    def new_session(self) -> aiohttp.ClientSession:
+        """One session, and connection pool, shared by every user of this process"""
+        return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.connections))
+    
+    async def monitor_event_loop(self, interval: float = 0.1):
+        """Record how late the event loop wakes up: lag means the client itself is busy"""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.record(max(time.perf_counter() - start - interval, 0))
+    
+    async def run_closed_model(self, user_ids: List[int], duration: int, workload_type: str) -> float:
+        """Run `user_ids` concurrently (each waits for its responses); returns the elapsed time"""
+        async with self.new_session() as session:
+            start_time = time.perf_counter()
+            await asyncio.gather(*(
+                self.run_user(session, user_id, duration, workload_type)
+                for user_id in user_ids
+            ))
+            return time.perf_counter() - start_time
+    
+    async def run_open_model(self, rps: float, duration: int, workload_type: str = 'mixed',
+                             arrival: str = 'constant', phase: float = 0.0, first_seq: int = 0,
+                             seq_step: int = 1) -> float:
+        """
+        Send requests on a fixed timeline (`rps` per second, evenly spaced or
+        Poisson arrivals) regardless of how long responses take; returns the
+        elapsed time. `phase` offsets the constant timeline (to interleave
+        several processes).
+        """
+        pending = set()
+        scheduled = 0
+        async with self.new_session() as session:
+            start_time = time.perf_counter()
+            scheduled_at = start_time + phase
+            end_time = start_time + duration
+            while True:
+                if arrival == 'poisson':
+                    scheduled_at += random.expovariate(rps)
+                else:
+                    scheduled_at = start_time + phase + scheduled / rps
+                if scheduled_at >= end_time:
+                    break
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                seq = first_seq + scheduled * seq_step
+                task = asyncio.create_task(self.scheduled_request(session, scheduled_at, workload_type, seq))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                scheduled += 1
+            
+            send_time = time.perf_counter() - start_time
+            if pending:
+                await asyncio.gather(*pending)
+            total_time = time.perf_counter() - start_time
         
-        for _ in range(random.randint(3, 8)):
-            endpoint = random.choice(endpoints)
-            result = await self.make_request(session, 'GET', endpoint)
-            self.results[endpoint].append(result['response_time'])
-            await asyncio.sleep(random.uniform(0.05, 0.2))
-    
-    async def api_write_operations(self, session: aiohttp.ClientSession, user_id: int):
-        """Simulate API write operations (creating users and posts)"""
-        # Create a user
-        user_data = {
-            'name': f'LoadTest User {user_id}',
-            'email': f'loadtest{user_id}@example.com',
-            'age': random.randint(18, 65)
+        self.rate_info = {
+            'target_rps': rps,
+            'arrival': arrival,
+            'scheduled': scheduled,
+            'send_time': send_time,
         }
+        return total_time
+    
+    async def run(self, model: str, start_at: float = None, process: int = 0, **options) -> float:
+        """
+        Run the closed or open model while measuring the load generator
+        itself (CPU time and event loop lag); returns the elapsed time.
         
-        result = await self.make_request(session, 'POST', '/api/users/', user_data)
-        self.results['/api/users/ (POST)'].append(result['response_time'])
-        await asyncio.sleep(0.1)
-        
-        # Create a blog post
-        post_data = {
-            'title': f'Load Test Post {user_id} - {datetime.now().isoformat()}',
-            'content': f'This is a load test post generated at {datetime.now()}',
-            'author': f'LoadTest User {user_id}',
-            'tags': ['loadtest', 'performance', 'testing'],
-            'metadata': {'load_test': True, 'user_id': user_id}
+        `start_at` (a time.time() value) lets several processes start together.
+        """
+        if start_at is not None:
+            await asyncio.sleep(max(start_at - time.time(), 0))
+        self.timeline_start = time.time() if start_at is None else start_at
+        if self.timeline_spool:
+            self.timeline_file = open(self.timeline_spool, 'w')
+        monitor = asyncio.create_task(self.monitor_event_loop())
+        cpu_start = time.process_time()
+        try:
+            if model == 'open':
+                total_time = await self.run_open_model(**options)
+            else:
+                total_time = await self.run_closed_model(**options)
+        finally:
+            monitor.cancel()
+            if self.timeline_file:
+                self.flush_timeline()
+                self.timeline_file.close()
+                self.timeline_file = None
+        cpu_time = time.process_time() - cpu_start
+        self.client_stats.append({
+            'process': process,
+            'pid': os.getpid(),
+            'requests': self.total_requests,
+            'cpu_percent': cpu_time / total_time * 100 if total_time else 0.0,
+            'loop_lag_p99': self.loop_lag.percentile(99),
+            'loop_lag_max': (self.loop_lag.max or 0) / 1_000_000,
+        })
+        return total_time
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Everything print_results needs, in a picklable/JSON-friendly form"""
+        return {
+            'results': {name: histogram.to_dict() for name, histogram in self.results.items()},
+            'response_bytes': dict(self.response_bytes),
+            'total_requests': self.total_requests,
+            'successful_requests': self.successful_requests,
+            'failed_requests': self.failed_requests,
+            'errors': self.errors[:self.MAX_ERRORS],
+            'dropped_errors': self.dropped_errors + max(len(self.errors) - self.MAX_ERRORS, 0),
+            'send_lag': self.send_lag.to_dict(),
+            'loop_lag': self.loop_lag.to_dict(),
+            'rate_info': self.rate_info,
+            'client_stats': self.client_stats,
         }
-        
-        result = await self.make_request(session, 'POST', '/api/posts/', post_data)
-        self.results['/api/posts/ (POST)'].append(result['response_time'])
-    
-    async def trigger_celery_tasks(self, session: aiohttp.ClientSession, user_id: int):
-        """Simulate triggering Celery background tasks"""
-        tasks = [
-            {'task_type': 'add', 'x': random.randint(1, 100), 'y': random.randint(1, 100)},
-            {'task_type': 'report', 'report_type': 'daily'},
-        ]
-        
-        for _ in range(random.randint(1, 3)):
-            task_data = random.choice(tasks)
-            result = await self.make_request(session, 'POST', '/api/tasks/trigger/', task_data)
-            self.results['/api/tasks/trigger/'].append(result['response_time'])
-            await asyncio.sleep(random.uniform(0.5, 1.0))
-    
-    async def mixed_workload(self, session: aiohttp.ClientSession, user_id: int):
-        """Simulate a realistic mixed workload"""
-        # 60% reads, 30% writes, 10% tasks
-        action = random.choices(
-            ['read', 'write', 'task', 'browse'],
-            weights=[40, 25, 10, 25],
-            k=1
-        )[0]
-        
-        if action == 'read':
-            await self.api_read_operations(session, user_id)
-        elif action == 'write':
-            await self.api_write_operations(session, user_id)
-        elif action == 'task':
-            await self.trigger_celery_tasks(session, user_id)
-        else:
-            await self.user_browsing_session(session, user_id)
     
-    async def run_user(self, user_id: int, duration: int, workload_type: str):
-        """Simulate a single user for the specified duration"""
-        async with aiohttp.ClientSession() as session:
-            end_time = time.time() + duration
-            
-            while time.time() < end_time:
-                try:
-                    if workload_type == 'browse':
-                        await self.user_browsing_session(session, user_id)
-                    elif workload_type == 'read':
-                        await self.api_read_operations(session, user_id)
-                    elif workload_type == 'write':
-                        await self.api_write_operations(session, user_id)
-                    elif workload_type == 'tasks':
-                        await self.trigger_celery_tasks(session, user_id)
-                    else:  # mixed
-                        await self.mixed_workload(session, user_id)
-                    
-                    await asyncio.sleep(random.uniform(0.1, 1.0))
-                except Exception as e:
-                    self.errors.append(f"User {user_id}: {str(e)}")
-    
-    async def run_load_test(self, num_users: int, duration: int, workload_type: str = 'mixed'):
-        """Run the load test with specified number of concurrent users"""
+    def merge(self, data: Dict[str, Any]):
+        """Add the statistics of another LoadTester (see to_dict)"""
+        for name, histogram in data['results'].items():
+            self.results[name].merge(LatencyHistogram.from_dict(histogram))
+        for name, size in data['response_bytes'].items():
+            self.response_bytes[name] += size
+        self.total_requests += data['total_requests']
+        self.successful_requests += data['successful_requests']
+        self.failed_requests += data['failed_requests']
+        self.errors.extend(data['errors'])
+        self.dropped_errors += data['dropped_errors']
+        self.send_lag.merge(LatencyHistogram.from_dict(data['send_lag']))
+        self.loop_lag.merge(LatencyHistogram.from_dict(data['loop_lag']))
+        if data['rate_info']:
+            if self.rate_info is None:
+                self.rate_info = dict(data['rate_info'])
+            else:
+                self.rate_info['target_rps'] += data['rate_info']['target_rps']
+                self.rate_info['scheduled'] += data['rate_info']['scheduled']
+                self.rate_info['send_time'] = max(self.rate_info['send_time'], data['rate_info']['send_time'])
+        self.client_stats.extend(data['client_stats'])
+    
+    @staticmethod
+    def print_header(title: str, lines: Dict[str, Any]):
         print(f"\n{'='*70}")
-        print(f"🚀 Starting Load Test")
+        print(f"🚀 {title}")
         print(f"{'='*70}")
-        print(f"  Base URL: {self.base_url}")
-        print(f"  Concurrent Users: {num_users}")
-        print(f"  Duration: {duration} seconds")
-        print(f"  Workload Type: {workload_type}")
+        for label, value in lines.items():
+            if value not in (None, ''):
+                print(f"  {label}: {value}")
         print(f"  Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"{'='*70}\n")
-        
-        start_time = time.time()
-        
-        # Create tasks for all users
-        tasks = [
-            self.run_user(user_id, duration, workload_type)
-            for user_id in range(num_users)
-        ]
-        
-        # Run all users concurrently
-        await asyncio.gather(*tasks)
-        
-        total_time = time.time() - start_time
-        
-        # Print results
-        self.print_results(total_time)
+    
+    def print_client_stats(self):
+        """Per-process load generator health: is the client or the server the bottleneck?"""
+        if not self.client_stats:
+            return
+        print(f"\n{'─'*70}")
+        print(f"🖥️  Load Generator")
+        print(f"{'─'*70}\n")
+        print(f"{'Process':<10} {'PID':>8} {'Requests':>10} {'CPU':>8} {'Loop lag P99':>14} {'Loop lag max':>14}")
+        print(f"{'─'*10} {'─'*8} {'─'*10} {'─'*8} {'─'*14} {'─'*14}")
+        saturated = []
+        for stats in sorted(self.client_stats, key=lambda s: s['process']):
+            print(f"{stats['process']:<10} {stats['pid']:>8} {stats['requests']:>10} "
+                  f"{stats['cpu_percent']:>7.1f}% {stats['loop_lag_p99'] * 1000:>12.1f}ms "
+                  f"{stats['loop_lag_max'] * 1000:>12.1f}ms")
+            if (stats['cpu_percent'] >= self.SATURATED_CPU_PERCENT
+                    or stats['loop_lag_p99'] >= self.SATURATED_LOOP_LAG):
+                saturated.append(stats['process'])
+        if saturated:
+            print(f"\n⚠️  Load generator saturated (process {', '.join(map(str, saturated))}): "
+                  f"response times include client-side queueing.")
+            print(f"   Add --processes, or lower --users/--rps, before blaming the server.")
+        else:
+            print(f"\n✅ Load generator not saturated: response times reflect the server.")
     
     def print_results(self, total_time: float):
         """Print detailed load test results"""
@@ -231,6 +708,20 @@ class LoadTester:
         print(f"✅ Successful: {self.successful_requests} ({self.successful_requests/max(self.total_requests,1)*100:.1f}%)")
         print(f"❌ Failed: {self.failed_requests} ({self.failed_requests/max(self.total_requests,1)*100:.1f}%)")
         print(f"🔥 Throughput: {self.total_requests/total_time:.2f} requests/second")
+        total_bytes = sum(self.response_bytes.values())
+        print(f"📦 Received: {total_bytes / 1024 / 1024:.2f} MB ({total_bytes / total_time / 1024:.1f} KB/s)")
+        if self.rate_info:
+            rate = self.rate_info
+            sent_rps = rate['scheduled'] / rate['send_time'] if rate['send_time'] else 0.0
+            completed_rps = self.total_requests / total_time
+            print(f"🎯 Target: {rate['target_rps']:.2f} req/s ({rate['arrival']}) | "
+                  f"Sent: {sent_rps:.2f} req/s | "
+                  f"Completed: {completed_rps:.2f} req/s "
+                  f"({completed_rps / rate['target_rps'] * 100:.1f}% of target) | "
+                  f"Successful: {self.successful_requests / total_time:.2f} req/s")
+            lag = self.send_lag.summary()
+            print(f"⏳ Send lag: P50 {lag['p50'] * 1000:.1f}ms, P99 {lag['p99'] * 1000:.1f}ms, "
+                  f"max {lag['max'] * 1000:.1f}ms (response times include it)")
         
         print(f"\n{'─'*70}")
         print(f"📍 Response Times by Endpoint")
@@ -238,60 +729,342 @@ class LoadTester:
         
         # Sort endpoints by average response time
         endpoint_stats = {}
-        for endpoint, times in self.results.items():
-            if times:
-                endpoint_stats[endpoint] = {
-                    'count': len(times),
-                    'avg': statistics.mean(times),
-                    'min': min(times),
-                    'max': max(times),
-                    'p50': statistics.median(times),
-                    'p95': sorted(times)[int(len(times) * 0.95)] if len(times) > 1 else times[0],
-                }
+        overall = LatencyHistogram()
+        for endpoint, histogram in self.results.items():
+            if histogram.count:
+                endpoint_stats[endpoint] = histogram.summary()
+                endpoint_stats[endpoint]['avg_kb'] = self.response_bytes[endpoint] / histogram.count / 1024
+                overall.merge(histogram)
         
         # Print in table format
-        print(f"{'Endpoint':<35} {'Count':>8} {'Avg':>8} {'Min':>8} {'Max':>8} {'P50':>8} {'P95':>8}")
-        print(f"{'─'*35} {'─'*8} {'─'*8} {'─'*8} {'─'*8} {'─'*8} {'─'*8}")
+        columns = ('avg', 'min', 'p50', 'p90', 'p99', 'p99.9', 'max')
+        labels = ('Avg', 'Min', 'P50', 'P90', 'P99', 'P99.9', 'Max')
+        print(f"{'Endpoint':<35} {'Count':>8} " + ' '.join(f'{label:>8}' for label in labels) + f" {'Avg KB':>8}")
+        print(f"{'─'*35} {'─'*8} " + ' '.join('─' * 8 for _ in columns) + f" {'─'*8}")
         
         for endpoint in sorted(endpoint_stats.keys(), key=lambda x: endpoint_stats[x]['avg']):
             stats = endpoint_stats[endpoint]
             print(f"{endpoint:<35} {stats['count']:>8} "
-                  f"{stats['avg']:>7.3f}s {stats['min']:>7.3f}s {stats['max']:>7.3f}s "
-                  f"{stats['p50']:>7.3f}s {stats['p95']:>7.3f}s")
+                  + ' '.join(f"{stats[c]:>7.3f}s" for c in columns)
+                  + f" {stats['avg_kb']:>8.1f}")
+        
+        if overall.count:
+            stats = overall.summary()
+            print(f"{'─'*35} {'─'*8} " + ' '.join('─' * 8 for _ in columns) + f" {'─'*8}")
+            print(f"{'All requests':<35} {stats['count']:>8} "
+                  + ' '.join(f"{stats[c]:>7.3f}s" for c in columns)
+                  + f" {total_bytes / overall.count / 1024:>8.1f}")
         
-        if self.errors:
+        self.print_client_stats()
+        
+        error_count = len(self.errors) + self.dropped_errors
+        if error_count:
             print(f"\n{'─'*70}")
             print(f"⚠️  Errors (showing first 10)")
             print(f"{'─'*70}\n")
             for error in self.errors[:10]:
                 print(f"  • {error}")
-            if len(self.errors) > 10:
-                print(f"\n  ... and {len(self.errors) - 10} more errors")
+            if error_count > 10:
+                print(f"\n  ... and {error_count - 10} more errors")
         
         print(f"\n{'='*70}")
         print(f"✅ Load Test Complete!")
         print(f"{'='*70}\n")
+    
+    def summary(self, total_time: float, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Final results as a JSON-friendly dict (the --summary file, and a --baseline)"""
+        endpoints = {}
+        overall = LatencyHistogram()
+        for name, histogram in self.results.items():
+            if histogram.count:
+                endpoints[name] = {**histogram.summary(), 'bytes': self.response_bytes[name]}
+                overall.merge(histogram)
+        return {
+            'config': config,
+            'started_at': datetime.fromtimestamp(self.timeline_start).isoformat(),
+            'duration': total_time,
+            'total_requests': self.total_requests,
+            'successful_requests': self.successful_requests,
+            'failed_requests': self.failed_requests,
+            'error_rate': self.failed_requests / max(self.total_requests, 1),
+            'throughput': self.total_requests / total_time,
+            'received_bytes': sum(self.response_bytes.values()),
+            'latency': overall.summary(),
+            'endpoints': endpoints,
+            'open_model': self.rate_info,
+            'load_generator': self.client_stats,
+            'errors': len(self.errors) + self.dropped_errors,
+        }
+    
+    @staticmethod
+    def read_timeline(spools: List[str]):
+        """
+        (second, {name: {'latency': LatencyHistogram, 'errors'}}) in order,
+        merging the timeline spools of all processes one second at a time
+        """
+        files = [open(path) for path in spools]
+        try:
+            lines = heapq.merge(*(map(json.loads, f) for f in files), key=lambda line: line['second'])
+            for second, group in itertools.groupby(lines, key=lambda line: line['second']):
+                intervals = {}
+                for line in group:
+                    for name, data in line['intervals'].items():
+                        interval = intervals.setdefault(name, {'latency': LatencyHistogram(), 'errors': 0})
+                        interval['latency'].merge(LatencyHistogram.from_dict(data['latency']))
+                        interval['errors'] += data['errors']
+                yield second, intervals
+        finally:
+            for f in files:
+                f.close()
+    
+    def timeseries(self, total_time: float, spools: List[str]):
+        """
+        One row per second for all requests ('*') and per endpoint, by
+        completion time, from the timeline spools. Latencies are in seconds;
+        the last interval can be shorter than a second (see 'interval').
+        """
+        def rows(second, intervals):
+            interval = min(max(total_time - second, 0.001), 1.0)
+            overall = {'latency': LatencyHistogram(), 'errors': 0}
+            for data in intervals.values():
+                overall['latency'].merge(data['latency'])
+                overall['errors'] += data['errors']
+            for name, data in [('*', overall)] + sorted(intervals.items()):
+                histogram, errors = data['latency'], data['errors']
+                yield {
+                    'second': second,
+                    'time': datetime.fromtimestamp(self.timeline_start + second).isoformat(timespec='seconds'),
+                    'endpoint': name,
+                    'interval': round(interval, 3),
+                    'requests': histogram.count,
+                    'rps': round(histogram.count / interval, 2),
+                    'errors': errors,
+                    'error_rate': round(errors / histogram.count, 4) if histogram.count else 0.0,
+                    **{
+                        key: round(histogram.percentile(pct), 6) if histogram.count else None
+                        for key, pct in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100))
+                    },
+                }
+        
+        # Seconds without any completed request still get an (empty) '*' row
+        expected = 0
+        for second, intervals in self.read_timeline(spools):
+            for empty in range(expected, second):
+                yield from rows(empty, {})
+            yield from rows(second, intervals)
+            expected = second + 1
+        for empty in range(expected, math.ceil(total_time)):
+            yield from rows(empty, {})
+    
+    def write_timeseries(self, path: str, total_time: float, spools: List[str]):
+        """Write timeseries() as CSV (*.csv) or JSON lines (anything else)"""
+        rows = self.timeseries(total_time, spools)
+        with open(path, 'w', newline='') as f:
+            if path.endswith('.csv'):
+                writer = None
+                for row in rows:
+                    if writer is None:
+                        writer = csv.DictWriter(f, fieldnames=list(row))
+                        writer.writeheader()
+                    writer.writerow(row)
+            else:
+                for row in rows:
+                    f.write(json.dumps(row) + '\n')
+
+
+# Baseline comparison: endpoints with fewer requests (in either run) are too
+# noisy to gate on, and latency changes below MIN_LATENCY_DELTA seconds are ignored
+MIN_BASELINE_COUNT = 100
+MIN_LATENCY_DELTA = 0.001
+
+
+def compare_with_baseline(summary: Dict[str, Any], baseline: Dict[str, Any],
+                          max_regression: float) -> List[Dict[str, Any]]:
+    """
+    Throughput and P95/P99 latencies (overall and per endpoint) of `summary`
+    against a saved --summary file. A metric regresses when it is worse by
+    more than `max_regression` (a fraction).
+    """
+    checks = [('Throughput (req/s)', baseline['throughput'], summary['throughput'], False)]
+    for pct in ('p95', 'p99'):
+        checks.append((f"All requests {pct.upper()}", baseline['latency'][pct], summary['latency'][pct], True))
+    for name in sorted(set(baseline['endpoints']) & set(summary['endpoints'])):
+        old, new = baseline['endpoints'][name], summary['endpoints'][name]
+        if min(old['count'], new['count']) < MIN_BASELINE_COUNT:
+            continue
+        for pct in ('p95', 'p99'):
+            checks.append((f"{name} {pct.upper()}", old[pct], new[pct], True))
+    
+    comparisons = []
+    for metric, old, new, is_latency in checks:
+        change = (new - old) / old if old else 0.0
+        worse_by = change if is_latency else -change
+        regressed = worse_by > max_regression
+        if is_latency and new - old < MIN_LATENCY_DELTA:
+            regressed = False
+        comparisons.append({
+            'metric': metric,
+            'baseline': old,
+            'current': new,
+            'change': change,
+            'regressed': regressed,
+            'is_latency': is_latency,
+        })
+    return comparisons
+
+
+def print_baseline_comparison(comparisons: List[Dict[str, Any]], max_regression: float,
+                              config_changes: Dict[str, Any]):
+    print(f"{'─'*70}")
+    print(f"📉 Baseline Comparison (max regression {max_regression:.0%})")
+    print(f"{'─'*70}\n")
+    if config_changes:
+        print("⚠️  The baseline was recorded with different settings: "
+              + ', '.join(f"{key} {old!r} -> {new!r}" for key, (old, new) in config_changes.items()))
+        print()
+    print(f"{'Metric':<45} {'Baseline':>10} {'Current':>10} {'Change':>8}")
+    print(f"{'─'*45} {'─'*10} {'─'*10} {'─'*8}")
+    for row in comparisons:
+        if row['is_latency']:
+            values = f"{row['baseline']:>9.3f}s {row['current']:>9.3f}s"
+        else:
+            values = f"{row['baseline']:>10.2f} {row['current']:>10.2f}"
+        flag = '  ❌' if row['regressed'] else ''
+        print(f"{row['metric']:<45} {values} {row['change']:>+7.1%}{flag}")
+    
+    regressions = [row for row in comparisons if row['regressed']]
+    if regressions:
+        print(f"\n❌ {len(regressions)} metric(s) regressed by more than {max_regression:.0%}")
+    else:
+        print(f"\n✅ No regression beyond {max_regression:.0%}")
+    print()
+
+
+def parse_percentage(value: str) -> float:
+    """'10%' or '10' -> 0.10"""
+    try:
+        return float(value.rstrip('%')) / 100
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a percentage such as 10%, got {value!r}")
+
+
+def run_process(base_url: str, scenario: Scenario, connections: int, timeline_spool: str,
+                run_options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Entry point of one --processes worker: run its share and return its
+    statistics (its --timeseries data goes to `timeline_spool`)
+    """
+    tester = LoadTester(base_url, scenario, connections=connections, timeline_spool=timeline_spool)
+    total_time = asyncio.run(tester.run(**run_options))
+    return {**tester.to_dict(), 'total_time': total_time}
+
+
+def process_shares(args) -> List[Dict[str, Any]]:
+    """Split the users (closed model) or the rate (open model) between the processes"""
+    shares = []
+    for i in range(args.processes):
+        if args.rps:
+            # Constant arrivals of the processes interleave: process i sends at
+            # i/rps, (i + processes)/rps, ...
+            shares.append({
+                'model': 'open',
+                'rps': args.rps / args.processes,
+                'duration': args.duration,
+                'workload_type': args.workload,
+                'arrival': args.arrival,
+                'phase': i / args.rps,
+                'first_seq': i,
+                'seq_step': args.processes,
+            })
+        else:
+            shares.append({
+                'model': 'closed',
+                'user_ids': list(range(i, args.users, args.processes)),
+                'duration': args.duration,
+                'workload_type': args.workload,
+            })
+    return shares
 
 
 async def main():
     parser = argparse.ArgumentParser(
-        description='Load test the Django + PyMongo + Motor + Celery application'
+        description='Load test the Django + PyMongo + Motor + Celery application '
+                    '(or any app described by a scenario file)'
     )
     parser.add_argument('--users', type=int, default=20,
                        help='Number of concurrent users (default: 20)')
     parser.add_argument('--duration', type=int, default=30,
                        help='Test duration in seconds (default: 30)')
-    parser.add_argument('--url', type=str, default='http://localhost:8000',
-                       help='Base URL (default: http://localhost:8000)')
-    parser.add_argument('--workload', type=str, default='mixed',
-                       choices=['mixed', 'browse', 'read', 'write', 'tasks'],
-                       help='Workload type (default: mixed)')
+    parser.add_argument('--url', type=str, default=None,
+                       help="Base URL (default: the scenario's base_url, http://localhost:8000 "
+                            "for this app)")
+    parser.add_argument('--scenario', type=str, default=Scenario.DEFAULT,
+                       help='Scenario file (YAML or JSON), or the name of a bundled one: '
+                            f"{', '.join(Scenario.bundled())} (default: {Scenario.DEFAULT})")
+    parser.add_argument('--var', action='append', default=[], metavar='NAME=VALUE',
+                       help='Set a scenario template variable (repeatable)')
+    parser.add_argument('--workload', type=str, default=None,
+                       help="Workload of the scenario, e.g. mixed, browse, read, write or tasks "
+                            "for this app (default: the scenario's default_workload)")
     parser.add_argument('--quick', action='store_true',
                        help='Quick test: 10 users for 15 seconds')
     parser.add_argument('--stress', action='store_true',
                        help='Stress test: 100 users for 60 seconds')
+    parser.add_argument('--rps', type=float, default=None,
+                       help='Open model: send this many requests per second regardless of '
+                            'response times (replaces --users); latency is measured from the '
+                            'scheduled send time')
+    parser.add_argument('--arrival', type=str, default='constant', choices=['constant', 'poisson'],
+                       help='Open model arrival process (default: constant)')
+    parser.add_argument('--processes', type=int, default=1,
+                       help='Worker processes generating the load; users (or the --rps rate) are '
+                            'split between them and the results merged (default: 1)')
+    parser.add_argument('--connections', type=int, default=100,
+                       help='Connection limit of each process, shared by its users (default: 100)')
+    parser.add_argument('--api-query', type=str, default=None,
+                       help='Query string added to the /api/users/ and /api/posts/ reads, '
+                            'e.g. "fields=all" or "fields=title,author" (same as --var api_query=...)')
+    parser.add_argument('--timeseries', type=str, default=None, metavar='FILE',
+                       help='Write per-second RPS, error rate and percentiles (overall and per '
+                            'endpoint) to FILE: CSV if it ends in .csv, JSON lines otherwise')
+    parser.add_argument('--summary', type=str, default=None, metavar='FILE',
+                       help='Write the final results as JSON to FILE (usable as a --baseline)')
+    parser.add_argument('--baseline', type=str, default=None, metavar='FILE',
+                       help='Compare with a saved --summary file and exit with status 1 if '
+                            'throughput or P95/P99 latency regressed')
+    parser.add_argument('--max-regression', type=parse_percentage, default=0.10, metavar='PCT',
+                       help='Regression tolerated by --baseline, e.g. 10%% (default: 10%%)')
     
     args = parser.parse_args()
+    if args.rps is not None and args.rps <= 0:
+        parser.error('--rps must be positive')
+    if args.processes < 1:
+        parser.error('--processes must be at least 1')
+    variables = {}
+    for assignment in args.var:
+        name, sep, value = assignment.partition('=')
+        if not sep:
+            parser.error(f'--var expects NAME=VALUE, got {assignment!r}')
+        variables[name] = value
+    if args.api_query is not None:
+        variables['api_query'] = args.api_query
+    try:
+        scenario = Scenario.load(args.scenario, variables)
+    except (OSError, ValueError) as e:
+        parser.error(f'invalid --scenario: {e}')
+    args.workload = args.workload or scenario.default_workload
+    if args.workload not in scenario.workloads:
+        parser.error(f"--workload {args.workload!r} is not in scenario {scenario.name!r} "
+                     f"(workloads: {', '.join(scenario.workloads)})")
+    args.url = args.url or scenario.base_url
+    
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error(f'cannot read --baseline {args.baseline}: {e}')
     
     if args.quick:
         args.users = 10
@@ -306,20 +1079,100 @@ async def main():
             async with session.get(args.url, timeout=aiohttp.ClientTimeout(total=5)) as response:
                 if response.status >= 500:
                     print(f"❌ Error: Application returned status {response.status}")
-                    return
+                    return 1
     except Exception as e:
         print(f"❌ Error: Cannot connect to {args.url}")
         print(f"   Make sure the application is running: make run")
-        return
+        return 1
+    
+    settings = {
+        'Base URL': args.url,
+        'Scenario': f"{scenario.name} ({os.path.relpath(scenario.path)})",
+    }
+    if args.rps:
+        title = 'Starting Load Test (open model)'
+        settings['Target Rate'] = f"{args.rps:g} requests/second ({args.arrival} arrivals)"
+    else:
+        title = 'Starting Load Test'
+        settings['Concurrent Users'] = args.users
+    settings.update({
+        'Duration': f"{args.duration} seconds",
+        'Workload Type': args.workload,
+        'Processes': f"{args.processes} ({args.connections} connections each)",
+        'Variables': ', '.join(f"{name}={value}" for name, value in scenario.variables.items() if value != ''),
+    })
+    LoadTester.print_header(title, settings)
+    
+    # Run load test; with --timeseries, each process spools its per-second
+    # histograms to a temporary file, merged into the time series at the end
+    spool_dir = tempfile.TemporaryDirectory(prefix='load_test_') if args.timeseries else None
+    spools = [
+        os.path.join(spool_dir.name, f'timeline-{i}.jsonl') if spool_dir else None
+        for i in range(args.processes)
+    ]
+    tester = LoadTester(args.url, scenario, connections=args.connections)
+    shares = process_shares(args)
+    if args.processes == 1:
+        tester.timeline_spool = spools[0]
+        total_time = await tester.run(**shares[0])
+    else:
+        # Spawned (not forked) children get a clean interpreter and event loop;
+        # all of them start at the same wall-clock time once imported
+        start_at = time.time() + 1 + 0.2 * args.processes
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(args.processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(pool, run_process, args.url, scenario, args.connections,
+                                     spools[i], {**share, 'start_at': start_at, 'process': i})
+                for i, share in enumerate(shares)
+            ))
+        tester.timeline_start = start_at
+        for data in results:
+            tester.merge(data)
+        total_time = max(data['total_time'] for data in results)
     
-    # Run load test
-    tester = LoadTester(args.url)
-    await tester.run_load_test(args.users, args.duration, args.workload)
+    tester.print_results(total_time)
+    
+    config = {
+        'url': args.url,
+        'workload': args.workload,
+        'users': None if args.rps else args.users,
+        'rps': args.rps,
+        'arrival': args.arrival if args.rps else None,
+        'duration': args.duration,
+        'processes': args.processes,
+        'connections': args.connections,
+        'scenario': scenario.name,
+        'variables': scenario.variables,
+    }
+    summary = tester.summary(total_time, config)
+    if args.timeseries:
+        tester.write_timeseries(args.timeseries, total_time, spools)
+        spool_dir.cleanup()
+        print(f"📝 Time series written to {args.timeseries}")
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"📝 Summary written to {args.summary}")
+    if args.timeseries or args.summary:
+        print()
+    
+    if baseline:
+        config_changes = {
+            key: (baseline['config'].get(key), value)
+            for key, value in config.items() if baseline['config'].get(key) != value
+        }
+        comparisons = compare_with_baseline(summary, baseline, args.max_regression)
+        print_baseline_comparison(comparisons, args.max_regression, config_changes)
+        if any(row['regressed'] for row in comparisons):
+            return 1
+    return 0
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        sys.exit(asyncio.run(main()))
     except KeyboardInterrupt:
         print("\n\n⚠️  Load test interrupted by user")
+        sys.exit(130)
 
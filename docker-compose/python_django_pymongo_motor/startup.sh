@@ -51,11 +51,39 @@ done
 echo "Running Django migrations..."
 python manage.py migrate --noinput
 
+# Create MongoDB indexes (idempotent)
+echo "Ensuring MongoDB indexes..."
+python manage.py ensure_indexes
+
+# Seed sample data once, before any worker starts serving requests
+# SEED_USERS / SEED_POSTS add a synthetic dataset (SEED_BATCH_SIZE, SEED_WORKERS)
+SEED_ARGS=()
+[ -n "$SEED_USERS" ] && SEED_ARGS+=(--users "$SEED_USERS")
+[ -n "$SEED_POSTS" ] && SEED_ARGS+=(--posts "$SEED_POSTS")
+[ -n "$SEED_BATCH_SIZE" ] && SEED_ARGS+=(--batch-size "$SEED_BATCH_SIZE")
+[ -n "$SEED_WORKERS" ] && SEED_ARGS+=(--workers "$SEED_WORKERS")
+echo "Seeding MongoDB sample data..."
+python manage.py seed_mongo "${SEED_ARGS[@]}"
+
 # Collect static files (optional, but good practice)
 echo "Collecting static files..."
 python manage.py collectstatic --noinput --clear 2>/dev/null || echo "No static files to collect"
 
-# Start the application using gunicorn with gevent workers
+# Start the application
+# SERVER_MODE=wsgi (default): gunicorn with gevent workers
+# SERVER_MODE=asgi: uvicorn, async views run natively on the event loop
+SERVER_MODE=${SERVER_MODE:-wsgi}
+
+if [ "$SERVER_MODE" = "asgi" ]; then
+    echo "Starting Django server with Uvicorn (ASGI)..."
+    exec ddtrace-run uvicorn myproject.asgi:application \
+        --host 0.0.0.0 \
+        --port 8000 \
+        --workers 3 \
+        --timeout-keep-alive 120 \
+        --log-level info
+fi
+
 echo "Starting Django server with Gunicorn + Gevent..."
 exec ddtrace-run gunicorn myproject.wsgi:application \
     --bind 0.0.0.0:8000 \